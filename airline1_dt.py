@@ -3,12 +3,17 @@
 # ===========================================
 
 import streamlit as st
-import pandas as pd
-import pickle
-import numpy as np
 import warnings
 warnings.filterwarnings('ignore')
 
+from airline_resources import get_drift_monitor, get_encoder, get_prediction_cache, get_stats
+from airline_stats import age_group
+from airline_timing import start_rerun, timing_enabled
+from airline_ui import bulk_scoring, debug_panel, show_explanation, show_whatif
+
+# Stage timings for the debug panel (AIRLINE_TIMING=1 or ?debug=1); no-ops otherwise
+timer = start_rerun(timing_enabled() or st.query_params.get('debug') == '1')
+
 # -------------------------------------------
 # 🌟 App Header and Intro
 # -------------------------------------------
@@ -32,20 +37,13 @@ st.title("Prediction of Customer Satisfaction (Decision Tree)")
 st.info("ℹ️ Please fill out the survey form in the sidebar and click **Predict** to see the satisfaction prediction.")
 
 # -------------------------------------------
-# 🧩 Load Model and Default Dataset
+# 🧩 Load Sidebar Metadata
 # -------------------------------------------
-with open('dt_airline.pickle', 'rb') as f:
-    clf = pickle.load(f)
-
-default_df = pd.read_csv('airline.csv').dropna().reset_index(drop=True)
-# --- Clean categorical text (normalize capitalization and spacing) ---
-default_df['customer_type'] = default_df['customer_type'].str.strip().str.title()
-default_df['type_of_travel'] = default_df['type_of_travel'].str.strip().str.title()
-default_df['class'] = default_df['class'].str.strip().str.title()
-
-# --- Ensure numeric columns are proper numbers ---
-numeric_cols = ['age', 'flight_distance', 'departure_delay_in_minutes', 'arrival_delay_in_minutes']
-default_df[numeric_cols] = default_df[numeric_cols].apply(pd.to_numeric, errors='coerce')
+# Category lists, numeric bounds and comparison stats from airline_meta.json
+# (precomputed from airline.csv). The model itself is loaded on first Predict.
+timer.checkpoint('header')
+with timer.stage('data_load'):
+    stats = get_stats()
 
 # -------------------------------------------
 # 🧭 Sidebar Input Form
@@ -58,20 +56,20 @@ st.sidebar.write('Provide information about the customer flying.')
 
 customer_type = st.sidebar.selectbox(
     "What type of customer is this?",
-    default_df['customer_type'].unique()
+    stats.levels('customer_type')
 )
 type_of_travel = st.sidebar.selectbox(
     "Is the customer travelling for business or personal reasons?",
-    default_df['type_of_travel'].unique()
+    stats.levels('type_of_travel')
 )
 class_type = st.sidebar.selectbox(
     "In which class will the customer be flying?",
-    default_df['class'].unique()
+    stats.levels('class')
 )
 age = st.sidebar.number_input(
     'How old is the customer?',
-    min_value=int(default_df['age'].min()),
-    max_value=int(default_df['age'].max()),
+    min_value=stats.bounds('age')[0],
+    max_value=stats.bounds('age')[1],
     step=1
 )
 
@@ -81,20 +79,20 @@ st.sidebar.write("Provide details about the customer's flight details.")
 
 miles = st.sidebar.number_input(
     'How far is the customer flying in miles?',
-    min_value=int(default_df['flight_distance'].min()),
-    max_value=int(default_df['flight_distance'].max()),
+    min_value=stats.bounds('flight_distance')[0],
+    max_value=stats.bounds('flight_distance')[1],
     step=1
 )
 departure_delay_in_minutes = st.sidebar.number_input(
     'How many minutes was the customer’s departure delayed? (Enter 0 if not delayed)',
-    min_value=int(default_df['departure_delay_in_minutes'].min()),
-    max_value=int(default_df['departure_delay_in_minutes'].max()),
+    min_value=stats.bounds('departure_delay_in_minutes')[0],
+    max_value=stats.bounds('departure_delay_in_minutes')[1],
     step=1
 )
 arrival_delay_in_minutes = st.sidebar.number_input(
     'How many minutes was the customer’s arrival delayed? (Enter 0 if not delayed)',
-    min_value=int(default_df['arrival_delay_in_minutes'].min()),
-    max_value=int(default_df['arrival_delay_in_minutes'].max()),
+    min_value=stats.bounds('arrival_delay_in_minutes')[0],
+    max_value=stats.bounds('arrival_delay_in_minutes')[1],
     step=1
 )
 
@@ -120,107 +118,118 @@ departure_arrival_time_convenient = st.sidebar.radio("Departure/arrival time con
 # -------------------------------------------
 # ✈️ Prediction Button
 # -------------------------------------------
+whatif_mode = st.sidebar.checkbox("🔀 Also show which rating changes would flip the prediction")
 predict_button = st.sidebar.button("✈️ Predict Satisfaction")
+timer.checkpoint('widgets')
 
 if predict_button:
     st.success("Prediction executed successfully!")
 
     # --- Construct input row matching model training ---
-    encode_df = default_df.drop(columns=['satisfaction']).copy()
-
-    encode_df.loc[len(encode_df)] = [
-        customer_type,                  # 1. customer_type
-        type_of_travel,                 # 2. type_of_travel
-        class_type,                     # 3. class
-        age,                            # 4. age
-        miles,                          # 5. flight_distance
-        departure_delay_in_minutes,     # 6. departure_delay_in_minutes
-        arrival_delay_in_minutes,       # 7. arrival_delay_in_minutes
-        seat_comfort,                   # 8. seat_comfort
-        food_and_drink,                 # 9. food_and_drink
-        gate_location,                  # 10. gate_location
-        inflight_wifi_service,          # 11. inflight_wifi_service
-        inflight_entertainment,         # 12. inflight_entertainment
-        online_support,                 # 13. online_support
-        ease_of_online_booking,         # 14. ease_of_online_booking
-        on_board_service,               # 15. on-board_service
-        leg_room_service,               # 16. leg_room_service
-        baggage_handling,               # 17. baggage_handling
-        checkin_service,                # 18. checkin_service
-        cleanliness,                    # 19. cleanliness
-        online_boarding,                # 20. online_boarding
-        departure_arrival_time_convenient  # 21. departure_arrival_time_convenient
-    ]
-
-    # --- Prepare data for prediction ---
-    for col in ['customer_type', 'type_of_travel', 'class']:
-        encode_df[col] = encode_df[col].astype(str)
-    # --- Normalize user categorical inputs to match training casing ---
-   # --- Normalize text to match training data ---
-    for col in ['customer_type', 'type_of_travel', 'class']:
-        encode_df[col] = encode_df[col].str.strip().str.title()
-
-
-    # One-hot encode categorical variables (just like in training)
-    encode_dummy_df = pd.get_dummies(encode_df, columns=['customer_type', 'type_of_travel', 'class'])
-
-    # Extract the user’s encoded row and align with model features
-    user_encoded_df = encode_dummy_df.tail(1)
-    user_encoded_df = user_encoded_df.reindex(columns=clf.feature_names_in_, fill_value=0)
-    user_encoded_df = user_encoded_df.apply(pd.to_numeric, errors='coerce')
-
-    # --- Debug check: ensure all numeric ---
-    non_numeric = user_encoded_df.select_dtypes(exclude=['number']).columns
-    if len(non_numeric) > 0:
-        st.error(f"Non-numeric columns remain: {list(non_numeric)}")
-    else:
-        # ✅ Make the prediction
-        predicted_satisfaction = clf.predict(user_encoded_df)[0]
-        predicted_proba = clf.predict_proba(user_encoded_df)[0]
-        confidence = max(predicted_proba) * 100
-
-        # --- Display prediction ---
-        st.markdown("<h2 style='color: green;'>Prediction Complete</h2>", unsafe_allow_html=True)
-        st.markdown(f"<h3>Predicted Satisfaction</h3>", unsafe_allow_html=True)
-        st.markdown(f"<h1 style='font-weight: bold; color:#0066cc;'>{predicted_satisfaction}</h1>", unsafe_allow_html=True)
-        st.markdown(
-            f"""
-            <div style="
-                background-color:#e6f0ff;
-                padding:10px;
-                border-radius:8px;
-                border:1px solid #99c2ff;
-                width:fit-content;
-            ">
-                <b>Prediction Confidence:</b> {confidence:.2f}%
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+    survey = {
+        'customer_type': customer_type,
+        'type_of_travel': type_of_travel,
+        'class': class_type,
+        'age': age,
+        'flight_distance': miles,
+        'departure_delay_in_minutes': departure_delay_in_minutes,
+        'arrival_delay_in_minutes': arrival_delay_in_minutes,
+        'seat_comfort': seat_comfort,
+        'food_and_drink': food_and_drink,
+        'gate_location': gate_location,
+        'inflight_wifi_service': inflight_wifi_service,
+        'inflight_entertainment': inflight_entertainment,
+        'online_support': online_support,
+        'ease_of_online_booking': ease_of_online_booking,
+        'on-board_service': on_board_service,
+        'leg_room_service': leg_room_service,
+        'baggage_handling': baggage_handling,
+        'checkin_service': checkin_service,
+        'cleanliness': cleanliness,
+        'online_boarding': online_boarding,
+        'departure_arrival_time_convenient': departure_arrival_time_convenient,
+    }
+
+    # Model is cached once per process and shared by every session
+    with timer.stage('model_load'):
+        encoder = get_encoder()
+        # LRU of recent predictions for this model version, shared by all sessions
+        predictions = get_prediction_cache()
+
+    # One-hot encode and align with model features in a single step
+    with timer.stage('encode'):
+        user_encoded = encoder.encode(survey)
+
+    # ✅ Make the prediction (a cache hit for repeat surveys, else one tree walk)
+    with timer.stage('inference'):
+        predicted_satisfaction, predicted_proba, explanation = predictions.explain_one(user_encoded)
+    confidence = max(predicted_proba) * 100
+
+    # Feed the process-wide drift monitor (a few counter increments)
+    with timer.stage('drift_update'):
+        monitor = get_drift_monitor()
+        if monitor is not None:
+            monitor.update(survey, predicted_satisfaction)
+
+    # --- Display prediction ---
+    st.markdown("<h2 style='color: green;'>Prediction Complete</h2>", unsafe_allow_html=True)
+    st.markdown(f"<h3>Predicted Satisfaction</h3>", unsafe_allow_html=True)
+    st.markdown(f"<h1 style='font-weight: bold; color:#0066cc;'>{predicted_satisfaction}</h1>", unsafe_allow_html=True)
+    st.markdown(
+        f"""
+        <div style="
+            background-color:#e6f0ff;
+            padding:10px;
+            border-radius:8px;
+            border:1px solid #99c2ff;
+            width:fit-content;
+        ">
+            <b>Prediction Confidence:</b> {confidence:.2f}%
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+    timer.checkpoint('render_prediction')
+
+    # --- Why this prediction? Decision path and contributions from the same tree walk ---
+    show_explanation(explanation, predicted_satisfaction, timer)
+
+    # --- What-if: every single and pairwise rating change, scored in one batch ---
+    if whatif_mode:
+        show_whatif(encoder, survey, timer)
 
 # -------------------------------------------
 # 📊 Comparison Expanders
 # -------------------------------------------
-with st.expander("🧍 Customer Type Comparison"):
-    pct = (default_df['customer_type'] == customer_type).mean() * 100
+with timer.stage('expander.customer_type'), st.expander("🧍 Customer Type Comparison"):
+    pct = stats.category_pct('customer_type', customer_type)
     st.write(f"**Your selection:** {customer_type}")
     st.write(f"Percentage of our flyers with this selection: {pct:.1f}%")
 
-with st.expander("🧳 Type of Travel Comparison"):
-    pct = (default_df['type_of_travel'] == type_of_travel).mean() * 100
+with timer.stage('expander.type_of_travel'), st.expander("🧳 Type of Travel Comparison"):
+    pct = stats.category_pct('type_of_travel', type_of_travel)
     st.write(f"**Your selection:** {type_of_travel}")
     st.write(f"Percentage of our flyers with this selection: {pct:.1f}%")
 
-with st.expander("💺 Flight Class Comparison"):
-    pct = (default_df['class'] == class_type).mean() * 100
+with timer.stage('expander.class'), st.expander("💺 Flight Class Comparison"):
+    pct = stats.category_pct('class', class_type)
     st.write(f"**Your selection:** {class_type}")
     st.write(f"Percentage of our flyers with this selection: {pct:.1f}%")
 
-with st.expander("🎂 Age Group Comparison"):
-    bins = [0, 18, 30, 45, 60, 75, 100]
-    labels = ['Under 18', '18–30', '31–45', '46–60', '61–75', '76+']
-    default_df['age_group'] = pd.cut(default_df['age'], bins=bins, labels=labels, right=False)
-    user_age_group = pd.cut([age], bins=bins, labels=labels, right=False)[0]
-    pct = (default_df['age_group'] == user_age_group).mean() * 100
+with timer.stage('expander.age_group'), st.expander("🎂 Age Group Comparison"):
+    user_age_group = age_group(age)
+    pct = stats.age_group_pct(user_age_group)
     st.write(f"**Your age group:** {user_age_group}")
     st.write(f"Percentage of our flyers in this group: {pct:.1f}%")
+
+# -------------------------------------------
+# 📁 Bulk Scoring
+# -------------------------------------------
+with timer.stage('bulk_scoring'):
+    bulk_scoring(stats)
+
+# -------------------------------------------
+# ⏱️ Debug Timing Panel
+# -------------------------------------------
+if timer.enabled:
+    debug_panel(timer, 'airline1_dt.py', predict_button)
@@ -0,0 +1,106 @@
+# ===========================================
+# 📁 BULK SURVEY SCORING
+# ===========================================
+# Scores a whole survey export (same schema as airline.csv) in fixed-size
+# chunks and streams the results back out, so memory stays flat no matter
+# how large the file is. Each chunk gets the apps' cleaning (title-cased
+# categoricals, numeric coercion) before it is encoded.
+#
+#   python airline_batch.py surveys.csv -o scored.csv
+#   python airline_batch.py surveys.csv --drift      # also compare with drift_baseline.json
+
+import argparse
+import time
+
+from airline_data import DEFAULT_CHUNKSIZE, clean_airline_df, read_airline_chunks
+from airline_model import default_model_path, load_predictor
+from airline_schema import DRIFT_BASELINE_PATH, FEATURE_COLS
+
+PREDICTION_COL = 'predicted_satisfaction'
+CONFIDENCE_COL = 'confidence'
+
+
+def encode_chunks(source, encoder, chunksize=DEFAULT_CHUNKSIZE):
+    """Stream ``source`` as ``(rows_read, cleaned chunk, encoded matrix)``.
+
+    Rows missing any model input cannot be scored and are dropped.
+    """
+    for rows_read, chunk in read_airline_chunks(source, chunksize, subset=FEATURE_COLS):
+        yield rows_read, chunk, encoder.encode_batch(chunk)
+
+
+def score_encoded(df, X, tree):
+    """Return ``df`` with prediction and confidence columns for its encoded rows ``X``."""
+    labels, proba = tree.predict(X)
+    return df.assign(**{PREDICTION_COL: labels, CONFIDENCE_COL: proba.max(axis=1)})
+
+
+def score_frame(df, encoder, tree):
+    """Return the cleaned ``df`` with prediction and confidence columns appended.
+
+    Rows missing any model input cannot be scored and are dropped.
+    """
+    df = clean_airline_df(df, subset=FEATURE_COLS)
+    return score_encoded(df, encoder.encode_batch(df), tree)
+
+
+def score_csv(source, dest, encoder, tree, chunksize=DEFAULT_CHUNKSIZE, on_chunk=None, monitor=None):
+    """Score ``source`` chunk by chunk and write the results CSV to ``dest``.
+
+    ``source`` and ``dest`` may be paths or file objects. ``on_chunk`` is
+    called with the running summary after every chunk; a DriftMonitor
+    ``monitor`` sees every scored chunk. Returns the final summary: rows
+    scored, rows skipped, seconds and rows per second.
+    """
+    summary = {'rows': 0, 'skipped': 0, 'seconds': 0.0, 'rows_per_sec': 0.0}
+    start = time.perf_counter()
+
+    for i, (rows_read, chunk, X) in enumerate(encode_chunks(source, encoder, chunksize)):
+        scored = score_encoded(chunk, X, tree)
+        scored.to_csv(dest, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        if monitor is not None:
+            monitor.update_frame(scored, scored[PREDICTION_COL])
+
+        summary['rows'] += len(scored)
+        summary['skipped'] += rows_read - len(scored)
+        summary['seconds'] = time.perf_counter() - start
+        summary['rows_per_sec'] = summary['rows'] / summary['seconds'] if summary['seconds'] else 0.0
+        if on_chunk is not None:
+            on_chunk(summary)
+
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score an airline survey CSV with the decision tree.')
+    parser.add_argument('input', help='CSV with the airline.csv columns')
+    parser.add_argument('-o', '--output', default='scored.csv', help='where to write the results CSV')
+    parser.add_argument('--model', default=default_model_path(),
+                        help='model bundle directory or pickled DecisionTreeClassifier')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='rows per chunk')
+    parser.add_argument('--drift', nargs='?', const=DRIFT_BASELINE_PATH, metavar='BASELINE',
+                        help='compare the scored rows with a drift baseline (default: %(const)s)')
+    args = parser.parse_args(argv)
+
+    encoder, tree = load_predictor(args.model)
+    monitor = None
+    if args.drift:
+        from airline_drift import format_report, load_monitor
+
+        monitor = load_monitor(args.drift)
+        if monitor is None:
+            parser.error(f'no drift baseline at {args.drift} (build it with: python airline_drift.py)')
+
+    def report(summary):
+        print(f"  {summary['rows']:,} rows scored ({summary['rows_per_sec']:,.0f} rows/s)")
+
+    summary = score_csv(args.input, args.output, encoder, tree, args.chunksize, on_chunk=report,
+                        monitor=monitor)
+    print(f"Done: {summary['rows']:,} rows scored, {summary['skipped']:,} skipped, "
+          f"{summary['seconds']:.2f}s ({summary['rows_per_sec']:,.0f} rows/s) -> {args.output}")
+    if monitor is not None:
+        print(format_report(monitor.check()))
+
+
+if __name__ == '__main__':
+    main()
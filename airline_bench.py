@@ -0,0 +1,534 @@
+# ===========================================
+# ⏱️ AIRLINE BENCHMARKS
+# ===========================================
+# Startup probes run in a fresh interpreter so import and load costs are
+# real cold-start numbers, not warm module caches. The suite times every
+# stage the apps pay for (loading, the per-click encode path, prediction,
+# the comparison expanders and a full AppTest rerun) on synthetic datasets
+# of several sizes, and writes machine-readable results so regressions show
+# up between versions.
+#
+#   python airline_bench.py startup [--app airline1_dt.py] [--repeat 3] [--json out.json]
+#   python airline_bench.py suite [--sizes 100000,1000000,10000000] [--json bench.json]
+#   python airline_bench.py workers [--counts 1,2,4] [--rows 1000000]   # launched app workers
+
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from airline_schema import (
+    BUNDLE_PATH, CATEGORICAL_COLS, CSV_PATH, MODEL_PATH, NUMERIC_COLS, RATING_COLS, TARGET_COL,
+)
+
+APPS = ['airline1_dt.py', 'airline_dt.py']
+PREDICT_BUTTON = '✈️ Predict Satisfaction'
+
+# Growth in private memory per worker that still counts as flat
+WORKER_TOLERANCE_MB = 10.0
+
+# Import cost of what an app needs before its first widget renders, and of
+# the deferred model/data stack for comparison
+IMPORT_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import streamlit, airline_resources, airline_stats
+light = time.perf_counter() - start
+pandas_loaded = 'pandas' in sys.modules
+start = time.perf_counter()
+import airline_model, airline_data
+heavy = time.perf_counter() - start
+print(json.dumps({'import_s': light, 'deferred_import_s': heavy, 'pandas_at_startup': pandas_loaded}))
+'''
+
+# Time to first render (a full first script run) and to the first prediction,
+# which pays for the deferred model load
+RENDER_PROBE = '''
+import json, sys, time, warnings
+warnings.filterwarnings('ignore')
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=300).run()
+first_render = time.perf_counter() - start
+pandas_loaded = 'pandas' in sys.modules
+start = time.perf_counter()
+at.sidebar.button[0].click().run()
+first_predict = time.perf_counter() - start
+start = time.perf_counter()
+at.sidebar.button[0].click().run()
+warm_predict = time.perf_counter() - start
+errors = [str(e.value) for e in at.exception]
+print(json.dumps({'first_render_s': first_render, 'first_predict_s': first_predict,
+                  'warm_predict_s': warm_predict, 'pandas_at_first_render': pandas_loaded,
+                  'errors': errors}))
+'''
+
+# Rerun cost of one app: cold first run, a warm rerun after a widget change,
+# and a Predict click
+RERUN_PROBE = '''
+import json, statistics, sys, time, warnings
+warnings.filterwarnings('ignore')
+from streamlit.testing.v1 import AppTest
+repeat = int(sys.argv[2])
+start = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=3600).run()
+first_run = time.perf_counter() - start
+reruns = []
+for i in range(repeat):
+    start = time.perf_counter()
+    at.sidebar.radio[0].set_value(i % 5 + 1).run()
+    reruns.append(time.perf_counter() - start)
+predicts = []
+for _ in range(repeat):
+    start = time.perf_counter()
+    at.sidebar.button[0].click().run()
+    predicts.append(time.perf_counter() - start)
+errors = [str(e.value) for e in at.exception]
+print(json.dumps({'first_run_ms': first_run * 1e3, 'rerun_ms': statistics.median(reruns) * 1e3,
+                  'predict_click_ms': statistics.median(predicts) * 1e3, 'errors': errors}))
+'''
+
+DEFAULT_SIZES = [100_000, 1_000_000, 10_000_000]
+
+
+def _probe(code, *args, cwd=None):
+    out = subprocess.run([sys.executable, '-c', code, *map(str, args)],
+                         capture_output=True, text=True, check=True, cwd=cwd)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _median_runs(runs):
+    """Median of every numeric field; other fields from the last run."""
+    result = dict(runs[-1])
+    for key, value in runs[0].items():
+        if isinstance(value, float):
+            result[key] = statistics.median(run[key] for run in runs)
+    return result
+
+
+def bench_startup(apps=APPS, repeat=3):
+    """Cold import time and time to first render for each app."""
+    results = {'imports': _median_runs([_probe(IMPORT_PROBE) for _ in range(repeat)])}
+    for app in apps:
+        results[app] = _median_runs([_probe(RENDER_PROBE, app) for _ in range(repeat)])
+    return results
+
+
+def _print_startup(results):
+    imports = results['imports']
+    print(f"imports before first render: {imports['import_s'] * 1000:8.1f} ms"
+          f"  (pandas loaded: {imports['pandas_at_startup']})")
+    print(f"deferred model/data imports: {imports['deferred_import_s'] * 1000:8.1f} ms")
+    for app, r in results.items():
+        if app == 'imports':
+            continue
+        print(f"{app}: first render {r['first_render_s'] * 1000:.1f} ms, "
+              f"first predict {r['first_predict_s'] * 1000:.1f} ms, "
+              f"warm predict {r['warm_predict_s'] * 1000:.1f} ms"
+              + (f"  ERRORS: {r['errors']}" if r['errors'] else ''))
+
+
+# -------------------------------------------
+# 🧪 Benchmark Suite
+# -------------------------------------------
+def _time(func, repeat=5, number=1):
+    """Median and min wall time per call, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return {'median_ms': statistics.median(timings) * 1e3, 'min_ms': min(timings) * 1e3,
+            'repeat': repeat, 'number': number}
+
+
+def make_synthetic(n_rows, source=CSV_PATH, seed=0):
+    """``n_rows`` surveys with the airline.csv schema, as a raw (uncleaned) frame.
+
+    Rows are resampled from ``source`` when it exists; otherwise every column
+    is drawn independently from plausible ranges.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if os.path.exists(source):
+        base = pd.read_csv(source).dropna()
+        return base.sample(n_rows, replace=True, random_state=seed).reset_index(drop=True)
+
+    rng = np.random.default_rng(seed)
+    levels = {
+        'customer_type': ['Loyal Customer', 'disloyal Customer'],
+        'type_of_travel': ['Business travel', 'Personal Travel'],
+        'class': ['Business', 'Eco', 'Eco Plus'],
+    }
+    data = {TARGET_COL: rng.choice(['satisfied', 'dissatisfied'], n_rows)}
+    for col in CATEGORICAL_COLS:
+        data[col] = rng.choice(levels[col], n_rows)
+    data['age'] = rng.integers(7, 86, n_rows)
+    data['flight_distance'] = rng.integers(50, 7000, n_rows)
+    for col in NUMERIC_COLS[2:]:
+        data[col] = rng.exponential(15, n_rows).astype(int)
+    for col in RATING_COLS:
+        data[col] = rng.integers(0, 6, n_rows)
+    return pd.DataFrame(data)
+
+
+_SURVEY = {'customer_type': 'Loyal Customer', 'type_of_travel': 'Business Travel', 'class': 'Eco',
+           'age': 40, 'flight_distance': 1500, 'departure_delay_in_minutes': 5,
+           'arrival_delay_in_minutes': 5, **{col: 3 for col in RATING_COLS}}
+
+
+def _legacy_encode(default_df, feature_names):
+    """The per-click encode path the apps used before SurveyEncoder."""
+    import pandas as pd
+
+    encode_df = default_df.drop(columns=[TARGET_COL]).copy()
+    encode_df.loc[len(encode_df)] = [_SURVEY[col] for col in encode_df.columns]
+    for col in CATEGORICAL_COLS:
+        encode_df[col] = encode_df[col].astype(str).str.strip().str.title()
+    encode_dummy_df = pd.get_dummies(encode_df, columns=CATEGORICAL_COLS)
+    user_encoded_df = encode_dummy_df.tail(1).reindex(columns=feature_names, fill_value=0)
+    return user_encoded_df.apply(pd.to_numeric, errors='coerce')
+
+
+def _legacy_expanders(default_df, age):
+    """The per-rerun comparison scans the apps used before StatsIndex."""
+    import pandas as pd
+
+    from airline_stats import AGE_BINS, AGE_LABELS
+
+    for col, value in [('customer_type', 'Loyal Customer'), ('type_of_travel', 'Business Travel'),
+                       ('class', 'Eco')]:
+        (default_df[col] == value).mean()
+    age_group = pd.cut(default_df['age'], bins=AGE_BINS, labels=AGE_LABELS, right=False)
+    user_age_group = pd.cut([age], bins=AGE_BINS, labels=AGE_LABELS, right=False)[0]
+    (age_group == user_age_group).mean()
+
+
+def _stats_expanders(stats, age):
+    from airline_stats import age_group
+
+    stats.category_pct('customer_type', 'Loyal Customer')
+    stats.category_pct('type_of_travel', 'Business Travel')
+    stats.category_pct('class', 'Eco')
+    stats.age_group_pct(age_group(age))
+
+
+def _app_workdir(csv_path, workdir):
+    """Copy the apps, modules and model next to a synthetic airline.csv."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    for path in glob.glob(os.path.join(here, '*.py')) + [os.path.join(here, 'airline.jpg'),
+                                                          os.path.join(here, MODEL_PATH)]:
+        if os.path.exists(path):
+            shutil.copy2(path, workdir)
+    if os.path.isdir(os.path.join(here, BUNDLE_PATH)):
+        shutil.copytree(os.path.join(here, BUNDLE_PATH), os.path.join(workdir, BUNDLE_PATH))
+    shutil.copy2(csv_path, os.path.join(workdir, CSV_PATH))
+
+
+def bench_size(n_rows, apps=APPS[:1], repeat=5, source=CSV_PATH):
+    """Every suite benchmark on one synthetic dataset of ``n_rows`` rows."""
+    import pandas as pd
+
+    from airline_data import clean_airline_df, load_airline_df, load_model
+    from airline_model import CompiledTree, SurveyEncoder, load_bundle
+    from airline_stats import StatsIndex
+
+    results = {}
+    # Expensive full-dataset steps are repeated less on big inputs
+    heavy = max(1, min(repeat, 1_000_000 * repeat // n_rows))
+
+    with tempfile.TemporaryDirectory(prefix='airline_bench_') as workdir:
+        csv_path = os.path.join(workdir, 'synthetic.csv')
+        make_synthetic(n_rows, source).to_csv(csv_path, index=False)
+        cache_path = os.path.join(workdir, 'cache')
+
+        # --- Loading ---
+        results['load.csv_parse_clean'] = _time(lambda: clean_airline_df(pd.read_csv(csv_path)), heavy)
+        results['load.cache_build'] = _time(lambda: load_airline_df(csv_path, cache_path), 1)
+        results['load.cache_warm'] = _time(lambda: load_airline_df(csv_path, cache_path), repeat)
+        results['load.pickle'] = _time(lambda: load_model(MODEL_PATH), repeat)
+        if os.path.isdir(BUNDLE_PATH):
+            results['load.bundle'] = _time(lambda: load_bundle(BUNDLE_PATH), repeat)
+
+        clf = load_model(MODEL_PATH)
+        encoder = SurveyEncoder.from_model(clf)
+        tree = CompiledTree.from_sklearn(clf)
+        default_df = clean_airline_df(pd.read_csv(csv_path))  # as the old apps held it
+        compact_df = load_airline_df(csv_path, cache_path)
+
+        # --- Per-click encode path ---
+        results['encode.legacy_get_dummies'] = _time(
+            lambda: _legacy_encode(default_df, clf.feature_names_in_), heavy)
+        results['encode.survey_encoder'] = _time(lambda: encoder.encode(_SURVEY), repeat, 1000)
+
+        # --- Prediction ---
+        row_df = encoder.encode_frame(_SURVEY)
+        row = encoder.encode(_SURVEY)
+        results['predict.sklearn_predict_and_proba'] = _time(
+            lambda: (clf.predict(row_df), clf.predict_proba(row_df)), repeat, 100)
+        results['predict.compiled_one'] = _time(lambda: tree.predict_one(row), repeat, 1000)
+        batch = encoder.encode_batch(compact_df.head(100_000))
+        results['predict.compiled_batch_100k'] = _time(lambda: tree.predict(batch), repeat)
+
+        # --- Comparison expanders ---
+        results['expanders.legacy_scans'] = _time(lambda: _legacy_expanders(default_df, 40), heavy)
+        results['stats.build'] = _time(lambda: StatsIndex.from_frame(compact_df), heavy)
+        stats = StatsIndex.from_frame(compact_df)
+        results['expanders.stats_index'] = _time(lambda: _stats_expanders(stats, 40), repeat, 1000)
+
+        results['memory.default_df_bytes'] = int(default_df.memory_usage(deep=True).sum())
+        results['memory.compact_df_bytes'] = int(compact_df.memory_usage(deep=True).sum())
+        del default_df, compact_df, batch
+
+        # --- Full script reruns (fresh process, app copied next to the data) ---
+        app_dir = os.path.join(workdir, 'app')
+        os.makedirs(app_dir)
+        _app_workdir(csv_path, app_dir)
+        for app in apps:
+            results[f'rerun.{app}'] = _probe(RERUN_PROBE, app, repeat, cwd=app_dir)
+
+    return results
+
+
+def _versions():
+    versions = {'python': platform.python_version(), 'platform': platform.platform()}
+    for module in ('numpy', 'pandas', 'sklearn', 'streamlit'):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            versions[module] = None
+    try:
+        versions['git_commit'] = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        versions['git_commit'] = None
+    return versions
+
+
+def bench_suite(sizes=DEFAULT_SIZES, apps=APPS[:1], repeat=5, source=CSV_PATH):
+    results = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': _versions(),
+        'sizes': {},
+    }
+    for n_rows in sizes:
+        print(f'--- {n_rows:,} rows ---', flush=True)
+        results['sizes'][str(n_rows)] = size_results = bench_size(n_rows, apps, repeat, source)
+        _print_size(size_results)
+    return results
+
+
+def _print_size(results):
+    for name, value in results.items():
+        if isinstance(value, dict) and 'median_ms' in value:
+            print(f"  {name:40s} {value['median_ms']:12.4f} ms")
+        elif isinstance(value, dict):
+            print(f"  {name:40s} " + ', '.join(f'{k}={v:.1f}' if isinstance(v, float) else f'{k}={v}'
+                                             for k, v in value.items()))
+        else:
+            print(f"  {name:40s} {value:,}")
+
+
+# -------------------------------------------
+# 🤝 Memory per Worker
+# -------------------------------------------
+def _memory_usage(pid='self'):
+    """RSS, PSS and USS (private) memory of a process in MB (Linux)."""
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    except OSError:
+        if pid != 'self':
+            raise
+        import resource
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return {'rss_mb': rss, 'pss_mb': None, 'uss_mb': None}
+    return {'rss_mb': fields['Rss'], 'pss_mb': fields['Pss'],
+            'uss_mb': fields['Private_Clean'] + fields['Private_Dirty']}
+
+
+def _wait_healthy(port, process, timeout=120):
+    import urllib.request
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'worker on port {port} exited with {process.returncode}')
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=2):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f'worker on port {port} did not start within {timeout}s')
+
+
+async def _drive_session(port, button_label, timeout=300):
+    """Open one browser-like session on a worker, render, then click ``button_label``."""
+    import asyncio
+
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+    from tornado.websocket import websocket_connect
+
+    async def rerun(ws, widgets=()):
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        msg.rerun_script.page_script_hash = ''
+        msg.rerun_script.widget_states.widgets.extend(widgets)
+        await ws.write_message(msg.SerializeToString(), binary=True)
+        buttons = {}
+        while True:
+            raw = await asyncio.wait_for(ws.read_message(), timeout)
+            if raw is None:
+                raise RuntimeError(f'worker on port {port} closed the session')
+            fwd = ForwardMsg()
+            fwd.ParseFromString(raw)
+            if fwd.WhichOneof('type') == 'delta' and fwd.delta.WhichOneof('type') == 'new_element':
+                element = fwd.delta.new_element
+                if element.WhichOneof('type') == 'button':
+                    buttons[element.button.label] = element.button.id
+                elif element.WhichOneof('type') == 'exception':
+                    raise RuntimeError(f'worker on port {port}: {element.exception.message}')
+            elif fwd.WhichOneof('type') == 'script_finished':
+                return buttons
+
+    ws = await websocket_connect(f'ws://127.0.0.1:{port}/_stcore/stream', subprotocols=['streamlit'])
+    try:
+        buttons = await rerun(ws)
+        click = WidgetState(id=buttons[button_label], trigger_value=True)
+        await rerun(ws, [click])
+    finally:
+        ws.close()
+
+
+def _measure_launch(workdir, app, n, base_port):
+    """Start ``n`` workers the way airline_shared.launch does, predict once in each, measure."""
+    import asyncio
+
+    from airline_shared import worker_command
+
+    processes = [subprocess.Popen(worker_command(app, base_port + i), cwd=workdir,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                 for i in range(n)]
+    try:
+        for i, process in enumerate(processes):
+            _wait_healthy(base_port + i, process)
+
+        async def drive_all():
+            await asyncio.gather(*(_drive_session(base_port + i, PREDICT_BUTTON) for i in range(n)))
+
+        asyncio.run(drive_all())
+        # Every worker is loaded and has predicted: PSS splits shared pages between them
+        return [_memory_usage(process.pid) for process in processes]
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+def bench_workers(counts=(1, 2, 4), modes=('private', 'shared'), n_rows=1_000_000, source=CSV_PATH,
+                  app=APPS[0], base_port=8700, tolerance_mb=WORKER_TOLERANCE_MB):
+    """Memory per launched app worker for each mode and worker count.
+
+    'shared' runs the workers on prepared files (memory-mapped model bundle);
+    'private' removes the bundle so every worker unpickles its own model.
+    Returns ``(results, failures)``: a failure is a mode whose private memory
+    per worker grows by more than ``tolerance_mb`` from the smallest to the
+    largest worker count.
+    """
+    counts = sorted(counts)
+    results, failures = {}, []
+    for mode in modes:
+        with tempfile.TemporaryDirectory(prefix='airline_bench_') as workdir:
+            csv_path = os.path.join(workdir, 'synthetic.csv')
+            make_synthetic(n_rows, source).to_csv(csv_path, index=False)
+            _app_workdir(csv_path, workdir)
+            subprocess.run([sys.executable, 'airline_shared.py', 'prepare'], cwd=workdir, check=True,
+                           stdout=subprocess.DEVNULL)
+            if mode == 'private':
+                shutil.rmtree(os.path.join(workdir, BUNDLE_PATH))
+
+            for n in counts:
+                usage = _measure_launch(workdir, app, n, base_port)
+                summary = {key: statistics.mean(u[key] for u in usage) for key in usage[0]}
+                summary['total_pss_mb'] = sum(u['pss_mb'] for u in usage)
+                results[f'{mode}.{n}'] = summary
+                print(f"{mode:8s} x{n:<3d} per worker: RSS {summary['rss_mb']:7.1f} MB"
+                      f"  PSS {summary['pss_mb']:7.1f} MB  private {summary['uss_mb']:7.1f} MB"
+                      f"  | all workers PSS {summary['total_pss_mb']:8.1f} MB", flush=True)
+
+        growth = results[f'{mode}.{counts[-1]}']['uss_mb'] - results[f'{mode}.{counts[0]}']['uss_mb']
+        if growth > tolerance_mb:
+            failures.append(f'{mode}: private memory per worker grew {growth:.1f} MB '
+                            f'from {counts[0]} to {counts[-1]} workers')
+    return results, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Airline app benchmarks.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    startup = sub.add_parser('startup', help='cold import time and time to first render')
+    startup.add_argument('--app', action='append', help='app script (default: both apps)')
+    startup.add_argument('--repeat', type=int, default=3, help='fresh-process runs per probe (median)')
+    startup.add_argument('--json', help='also write the results to this file')
+
+    suite = sub.add_parser('suite', help='load/encode/predict/expander/rerun timings per dataset size')
+    suite.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                       help='comma-separated synthetic dataset sizes (rows)')
+    suite.add_argument('--app', action='append', help='app script for the rerun timing (default: airline1_dt.py)')
+    suite.add_argument('--repeat', type=int, default=5, help='timed runs per benchmark (median)')
+    suite.add_argument('--source', default=CSV_PATH, help='CSV to resample synthetic rows from')
+    suite.add_argument('--json', help='also write the results to this file')
+
+    workers = sub.add_parser('workers', help='memory per launched app worker, private model vs shared bundle')
+    workers.add_argument('--counts', default='1,2,4', help='comma-separated worker counts')
+    workers.add_argument('--rows', type=int, default=1_000_000, help='synthetic dataset size')
+    workers.add_argument('--mode', action='append', choices=['private', 'shared'],
+                         help='default: both')
+    workers.add_argument('--app', default=APPS[0], help='app script the workers serve')
+    workers.add_argument('--base-port', type=int, default=8700)
+    workers.add_argument('--tolerance-mb', type=float, default=WORKER_TOLERANCE_MB,
+                         help='allowed growth of private memory per worker (default: %(default)s)')
+    workers.add_argument('--source', default=CSV_PATH, help='CSV to resample synthetic rows from')
+    workers.add_argument('--json', help='also write the results to this file')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'startup':
+        results = bench_startup(args.app or APPS, args.repeat)
+        _print_startup(results)
+    elif args.command == 'suite':
+        sizes = [int(size) for size in args.sizes.split(',')]
+        results = bench_suite(sizes, args.app or APPS[:1], args.repeat, args.source)
+    elif args.command == 'workers':
+        counts = [int(n) for n in args.counts.split(',')]
+        results, failures = bench_workers(counts, args.mode or ['private', 'shared'], args.rows, args.source,
+                                          args.app, args.base_port, args.tolerance_mb)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.command == 'workers' and failures:
+        sys.exit('FAIL: ' + '; '.join(failures))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+# ===========================================
+# 📂 AIRLINE DATA LOADING
+# ===========================================
+# Loading and cleaning shared by the apps and the scoring tools. Files too large
+# to load at once can be streamed as cleaned chunks (read_airline_chunks)
+# with the same normalisation.
+#
+# The cleaned frame is kept in compact dtypes (pandas categoricals for the
+# text columns, int8 star ratings, the smallest safe int for ages, distances
+# and delays) and cached on disk as one .npy file per column plus a manifest
+# that records which version of airline.csv it came from. Loads reuse the
+# cache until the CSV changes, skipping the text parse and cleanup entirely.
+#
+#   python airline_data.py      # memory report: bytes per column, before/after
+
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from airline_schema import (
+    CACHE_PATH, CATEGORICAL_COLS, CSV_PATH, FEATURE_COLS, MANIFEST_NAME, MODEL_PATH,
+    NUMERIC_COLS, RATING_COLS, TARGET_COL, file_version,
+)
+
+CACHE_FORMAT = 2
+
+# Text columns stored as pandas categoricals
+CATEGORY_COLS = [TARGET_COL] + CATEGORICAL_COLS
+
+# Rows per chunk when streaming a survey file
+DEFAULT_CHUNKSIZE = 50_000
+
+
+def clean_airline_df(df, subset=None):
+    """Coerce numeric columns, drop NAs and normalize categorical text.
+
+    ``subset`` limits the NA check to those columns (default: all). Values
+    that are not numbers (e.g. age 'abc') count as missing.
+    """
+    # --- Ensure numeric inputs are proper numbers, before the NA check ---
+    df = df.assign(**{col: pd.to_numeric(df[col], errors='coerce') for col in NUMERIC_COLS + RATING_COLS})
+    df = df.dropna(subset=subset).reset_index(drop=True)
+
+    # --- Clean categorical text (normalize capitalization and spacing) ---
+    for col in CATEGORICAL_COLS:
+        df[col] = df[col].str.strip().str.title()
+    return df
+
+
+def read_airline_chunks(source=CSV_PATH, chunksize=DEFAULT_CHUNKSIZE, subset=None):
+    """Stream a survey CSV as cleaned chunks of at most ``chunksize`` rows.
+
+    Yields ``(rows_read, chunk)``: the raw row count and the chunk after
+    ``clean_airline_df``, so callers can report how many rows were dropped.
+    ``source`` may be a path or a file object; memory is bounded by the
+    chunk size, not the file size.
+    """
+    for raw in pd.read_csv(source, chunksize=chunksize):
+        yield len(raw), clean_airline_df(raw, subset)
+
+
+def smallest_int_dtype(values):
+    """Narrowest signed int dtype that holds ``values``, or None if not whole numbers."""
+    values = np.asarray(values)
+    if not len(values):
+        return np.dtype(np.int8)
+    if values.dtype.kind == 'f' and not np.array_equal(values, np.round(values)):
+        return None
+    low, high = values.min(), values.max()
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return None
+
+
+def compact_airline_df(df):
+    """Memory-optimised copy of a cleaned frame.
+
+    Text columns become pandas Categoricals, the 1–5 star ratings int8 and
+    ages, distances and delays the smallest int type that holds their range.
+    """
+    df = df.copy()
+    for col in CATEGORY_COLS:
+        if col in df:
+            df[col] = df[col].astype('category')
+    for col in RATING_COLS:
+        df[col] = df[col].astype(np.int8)
+    for col in NUMERIC_COLS:
+        dtype = smallest_int_dtype(df[col].to_numpy())
+        if dtype is not None:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def memory_report(before, after):
+    """Bytes per column for two versions of the same frame, plus a total row."""
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'bytes_before': before.memory_usage(deep=True, index=False),
+        'dtype_after': after.dtypes.astype(str),
+        'bytes_after': after.memory_usage(deep=True, index=False),
+    })
+    report.loc['TOTAL'] = ['', report['bytes_before'].sum(), '', report['bytes_after'].sum()]
+    report['ratio'] = (report['bytes_before'] / report['bytes_after']).round(1)
+    return report
+
+
+# -------------------------------------------
+# 💾 Columnar Cache
+# -------------------------------------------
+def write_cache(df, cache_path=CACHE_PATH, source=None):
+    """Store ``df`` column by column; ``source`` is the CSV's file_version()."""
+    os.makedirs(cache_path, exist_ok=True)
+    columns = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        entry = {'name': col, 'file': f'col{i:02d}.npy'}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            values = series.cat.codes.to_numpy()
+            entry['categories'] = [str(c) for c in series.cat.categories]
+        else:
+            values = series.to_numpy()
+        entry['dtype'] = values.dtype.str
+        tmp_file = os.path.join(cache_path, f'{entry["file"]}.{os.getpid()}.tmp')
+        with open(tmp_file, 'wb') as f:
+            np.save(f, values)
+        os.replace(tmp_file, os.path.join(cache_path, entry['file']))
+        columns.append(entry)
+
+    manifest = {'format': CACHE_FORMAT, 'source': list(source) if source else None,
+                'n_rows': len(df), 'columns': columns}
+    # Written last: a manifest always describes complete column files
+    tmp_manifest = os.path.join(cache_path, f'{MANIFEST_NAME}.{os.getpid()}.tmp')
+    with open(tmp_manifest, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_manifest, os.path.join(cache_path, MANIFEST_NAME))
+
+
+def read_cache_manifest(cache_path=CACHE_PATH):
+    with open(os.path.join(cache_path, MANIFEST_NAME), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != CACHE_FORMAT:
+        raise ValueError(f"{cache_path}: unsupported cache format {manifest.get('format')!r}")
+    return manifest
+
+
+def read_cache(cache_path=CACHE_PATH, manifest=None, mmap_mode=None):
+    """Rebuild the cleaned frame from the columnar cache.
+
+    With ``mmap_mode='r'`` every column is a read-only memory map of its
+    .npy file (no copy), so processes on one host share the same physical
+    pages through the OS page cache.
+    """
+    if manifest is None:
+        manifest = read_cache_manifest(cache_path)
+    data = {}
+    for entry in manifest['columns']:
+        values = np.load(os.path.join(cache_path, entry['file']), mmap_mode=mmap_mode)
+        if values.dtype.str != entry['dtype'] or len(values) != manifest['n_rows']:
+            raise ValueError(f"{cache_path}: {entry['name']} does not match the manifest")
+        if 'categories' in entry:
+            # Validating the codes would read every page of a mapped file
+            values = pd.Categorical.from_codes(values, entry['categories'], validate=mmap_mode is None)
+        data[entry['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def load_airline_df(path=CSV_PATH, cache_path=CACHE_PATH, mmap_mode=None):
+    """Cleaned airline.csv, served from the columnar cache while it is current.
+
+    Pass ``cache_path=None`` to always parse the CSV. ``mmap_mode`` is passed
+    to read_cache(); a freshly built cache is then re-opened memory-mapped.
+    """
+    source = list(file_version(path))
+    if cache_path:
+        try:
+            manifest = read_cache_manifest(cache_path)
+            if manifest['source'] == source:
+                return read_cache(cache_path, manifest, mmap_mode)
+        except (OSError, ValueError, KeyError):
+            pass  # missing or unreadable cache: rebuild below
+
+    df = compact_airline_df(clean_airline_df(pd.read_csv(path)))
+    if cache_path:
+        write_cache(df, cache_path, source)
+        if mmap_mode:
+            return read_cache(cache_path, mmap_mode=mmap_mode)
+    return df
+
+
+def load_model(path=MODEL_PATH):
+    """Unpickle the trained decision tree."""
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def holdout_split(path=CSV_PATH, test_size=0.2, random_state=1, cache_path=CACHE_PATH):
+    """Reproduce the notebook's train/test split on the cleaned dataset.
+
+    Returns (train_df, test_df) with the FEATURE_COLS and the target, not yet
+    one-hot encoded; rows are the same ones the notebook selects.
+    """
+    from sklearn.model_selection import train_test_split
+
+    airline_df = load_airline_df(path, cache_path)
+    return train_test_split(airline_df[FEATURE_COLS + [TARGET_COL]],
+                            test_size=test_size, random_state=random_state)
+
+
+if __name__ == '__main__':
+    plain = clean_airline_df(pd.read_csv(CSV_PATH))
+    compact = compact_airline_df(plain)
+    report = memory_report(plain, compact)
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 120):
+        print(report)
+    total = report.loc['TOTAL']
+    print(f"\n{len(plain):,} rows: {total['bytes_before'] / 1e6:.1f} MB -> "
+          f"{total['bytes_after'] / 1e6:.1f} MB per resident copy")
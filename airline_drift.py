@@ -0,0 +1,347 @@
+# ===========================================
+# 📡 DRIFT AND DATA-QUALITY MONITORING
+# ===========================================
+# Streaming sketches of every model input and of the predicted-class mix,
+# compared against a baseline built from the notebook's training split.
+#
+#   numeric and rating inputs   fixed-bin histograms (baseline deciles for
+#                               ages, distances and delays; one bin per star)
+#                               plus under/overflow and missing counts
+#   categorical inputs          a small count-min sketch
+#   predictions                 counts per class
+#
+# Memory is fixed by the bin counts and sketch size, and each prediction
+# costs a constant number of increments. Every ``check_every`` updates the
+# sketches are compared with the baseline using the population stability
+# index (PSI): above 0.1 is worth a look, above 0.25 is drift. Nothing is
+# flagged before MIN_SURVEYS have been seen (small samples look drifted).
+#
+#   python airline_drift.py                # build drift_baseline.json from the training split
+
+import json
+import math
+import os
+import threading
+import zlib
+from bisect import bisect_right
+from datetime import datetime, timezone
+
+from airline_schema import (
+    CACHE_PATH, CATEGORICAL_COLS, CSV_PATH, DRIFT_BASELINE_PATH, NUMERIC_COLS, RATING_COLS,
+)
+
+# Optional: where to write the latest drift report (JSON) after every check
+REPORT_ENV = 'AIRLINE_DRIFT_REPORT'
+
+# One bin per star, with room for the 0 ("not answered") rating
+RATING_EDGES = [0.5, 1.5, 2.5, 3.5, 4.5]
+N_QUANTILE_BINS = 10
+
+CMS_WIDTH = 64
+CMS_DEPTH = 4
+
+DEFAULT_CHECK_EVERY = 500
+MIN_SURVEYS = 500
+PSI_WARN = 0.1
+PSI_DRIFT = 0.25
+
+# Floor for empty bins so PSI stays finite
+_PSI_EPSILON = 1e-4
+
+
+def psi(expected, actual):
+    """Population stability index between two count (or share) vectors."""
+    total_e, total_a = sum(expected), sum(actual)
+    if not total_e or not total_a:
+        return 0.0
+    value = 0.0
+    for e, a in zip(expected, actual):
+        e = max(e / total_e, _PSI_EPSILON)
+        a = max(a / total_a, _PSI_EPSILON)
+        value += (a - e) * math.log(a / e)
+    return value
+
+
+def psi_status(value, n=MIN_SURVEYS):
+    if n < MIN_SURVEYS:
+        return 'too few'
+    return 'drift' if value > PSI_DRIFT else 'warn' if value > PSI_WARN else 'ok'
+
+
+# -------------------------------------------
+# 🧮 Sketches
+# -------------------------------------------
+class Histogram:
+    """Counts over fixed bin edges: [< edges[0]], ..., [>= edges[-1]], plus missing."""
+
+    def __init__(self, edges, counts=None, missing=0):
+        self.edges = list(edges)
+        self.counts = list(counts) if counts is not None else [0] * (len(self.edges) + 1)
+        self.missing = missing
+
+    def add(self, value):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            self.missing += 1
+            return
+        if value != value:  # NaN
+            self.missing += 1
+            return
+        self.counts[bisect_right(self.edges, value)] += 1
+
+    def add_many(self, values):
+        """Add an array of values (vectorized; NaN counts as missing)."""
+        import numpy as np
+
+        values = np.asarray(values, dtype=np.float64)
+        nan = np.isnan(values)
+        self.missing += int(nan.sum())
+        bins = np.searchsorted(self.edges, values[~nan], side='right')
+        for i, count in enumerate(np.bincount(bins, minlength=len(self.counts)).tolist()):
+            self.counts[i] += count
+
+    @property
+    def total(self):
+        return sum(self.counts)
+
+    def to_dict(self):
+        return {'edges': self.edges, 'counts': self.counts, 'missing': self.missing}
+
+
+class CountMinSketch:
+    """Approximate counts of category levels in a fixed ``depth x width`` table."""
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH):
+        self.width = width
+        self.depth = depth
+        self.table = [[0] * width for _ in range(depth)]
+        self.total = 0
+
+    def _cells(self, value):
+        key = str(value).encode('utf-8')
+        return [zlib.crc32(key, seed) % self.width for seed in range(self.depth)]
+
+    def add(self, value, count=1):
+        for row, cell in zip(self.table, self._cells(value)):
+            row[cell] += count
+        self.total += count
+
+    def estimate(self, value):
+        """Upper-bound estimate of how often ``value`` was added."""
+        return min(row[cell] for row, cell in zip(self.table, self._cells(value)))
+
+
+# -------------------------------------------
+# 📏 Baseline
+# -------------------------------------------
+def build_baseline(train_df, labels):
+    """Reference distributions from the (cleaned) training rows and their predictions."""
+    import numpy as np
+
+    histograms = {}
+    for col in NUMERIC_COLS:
+        values = train_df[col].to_numpy(dtype=np.float64)
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, N_QUANTILE_BINS + 1)[1:-1]))
+        histograms[col] = Histogram(edges.tolist())
+    for col in RATING_COLS:
+        histograms[col] = Histogram(RATING_EDGES)
+    for col, histogram in histograms.items():
+        histogram.add_many(train_df[col].to_numpy(dtype=np.float64))
+
+    categories = {}
+    for col in CATEGORICAL_COLS:
+        counts = train_df[col].astype(str).str.strip().str.title().value_counts()
+        categories[col] = {str(level): int(count) for level, count in counts.items()}
+
+    classes, class_counts = np.unique(np.asarray(labels).astype(str), return_counts=True)
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'n_rows': len(train_df),
+        'histograms': {col: histogram.to_dict() for col, histogram in histograms.items()},
+        'categories': categories,
+        'predictions': dict(zip(classes.tolist(), class_counts.tolist())),
+    }
+
+
+def _write_json(data, path):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def save_baseline(baseline, path=DRIFT_BASELINE_PATH):
+    _write_json(baseline, path)
+
+
+def load_baseline(path=DRIFT_BASELINE_PATH):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_baseline(csv_path=CSV_PATH, model_path=None, path=DRIFT_BASELINE_PATH, cache_path=CACHE_PATH):
+    """Build the baseline from the training split of ``csv_path``; returns its row count.
+
+    ``cache_path`` is the columnar cache the cleaned CSV is read through.
+    """
+    from airline_data import holdout_split
+    from airline_model import default_model_path, load_predictor
+
+    train_df, _ = holdout_split(csv_path, cache_path=cache_path)
+    encoder, tree = load_predictor(model_path or default_model_path())
+    labels, _ = tree.predict(encoder.encode_batch(train_df))
+    save_baseline(build_baseline(train_df, labels), path)
+    return len(train_df)
+
+
+# -------------------------------------------
+# 📡 Monitor
+# -------------------------------------------
+class DriftMonitor:
+    """Streaming sketches of scored traffic, checked against a baseline.
+
+    ``update`` (one survey) and ``update_frame`` (a cleaned chunk) are safe
+    to call from several sessions at once.
+    """
+
+    def __init__(self, baseline, check_every=DEFAULT_CHECK_EVERY, report_path=None):
+        self.baseline = baseline
+        self.check_every = check_every
+        self.report_path = report_path
+        self.histograms = {col: Histogram(data['edges'])
+                           for col, data in baseline['histograms'].items()}
+        self.categories = {col: CountMinSketch() for col in CATEGORICAL_COLS}
+        self.predictions = {}
+        self.n = 0
+        self.report = None
+        self._since_check = 0
+        self._lock = threading.Lock()
+
+    def update(self, survey, label):
+        """Add one survey (dict of raw column -> value) and its predicted label."""
+        with self._lock:
+            for col, histogram in self.histograms.items():
+                histogram.add(survey.get(col))
+            for col, sketch in self.categories.items():
+                sketch.add(str(survey.get(col)).strip().title())
+            label = str(label)
+            self.predictions[label] = self.predictions.get(label, 0) + 1
+            self.n += 1
+            self._since_check += 1
+            due = self._since_check >= self.check_every
+        if due:
+            self.check()
+
+    def update_frame(self, df, labels):
+        """Add a cleaned chunk of surveys and their predicted labels (O(len(df)))."""
+        import numpy as np
+
+        with self._lock:
+            for col, histogram in self.histograms.items():
+                histogram.add_many(df[col].to_numpy(dtype=np.float64))
+            for col, sketch in self.categories.items():
+                for level, count in df[col].astype(str).value_counts().items():
+                    sketch.add(level, int(count))
+            classes, counts = np.unique(np.asarray(labels).astype(str), return_counts=True)
+            for label, count in zip(classes.tolist(), counts.tolist()):
+                self.predictions[label] = self.predictions.get(label, 0) + count
+            self.n += len(df)
+            self._since_check += len(df)
+            due = self._since_check >= self.check_every
+        if due:
+            self.check()
+
+    def check(self):
+        """Compare the sketches with the baseline; returns (and keeps) the report."""
+        with self._lock:
+            features = {}
+            for col, histogram in self.histograms.items():
+                base = self.baseline['histograms'][col]
+                value = psi(base['counts'], histogram.counts)
+                seen = histogram.total + histogram.missing
+                features[col] = {'psi': round(value, 4), 'status': psi_status(value, self.n),
+                                 'missing_pct': round(histogram.missing / seen * 100, 2) if seen else 0.0}
+
+            for col, sketch in self.categories.items():
+                levels = self.baseline['categories'][col]
+                estimates = [min(sketch.estimate(level), sketch.total) for level in levels]
+                # Mass the baseline never saw (approximate: the sketch over-counts known levels)
+                unknown = max(sketch.total - sum(estimates), 0)
+                value = psi(list(levels.values()) + [0], estimates + [unknown])
+                features[col] = {'psi': round(value, 4), 'status': psi_status(value, self.n),
+                                 'unknown_pct': round(unknown / sketch.total * 100, 2) if sketch.total else 0.0}
+
+            base_mix = self.baseline['predictions']
+            classes = sorted(set(base_mix) | set(self.predictions))
+            value = psi([base_mix.get(c, 0) for c in classes], [self.predictions.get(c, 0) for c in classes])
+            total = sum(self.predictions.values())
+            predictions = {
+                'psi': round(value, 4),
+                'status': psi_status(value, self.n),
+                'mix_pct': {c: round(self.predictions.get(c, 0) / total * 100, 2) if total else 0.0
+                            for c in classes},
+                'baseline_mix_pct': {c: round(base_mix.get(c, 0) / sum(base_mix.values()) * 100, 2)
+                                     for c in classes},
+            }
+
+            self.report = {
+                'checked': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'surveys': self.n,
+                'drifted': sorted(col for col, f in features.items() if f['status'] == 'drift'),
+                'warnings': sorted(col for col, f in features.items() if f['status'] == 'warn'),
+                'predictions': predictions,
+                'features': features,
+            }
+            self._since_check = 0
+            report = self.report
+
+        if self.report_path:
+            _write_json(report, self.report_path)
+        return report
+
+
+def format_report(report):
+    """Markdown summary of a drift report: flagged inputs, class mix, PSI per input."""
+    if not report:
+        return '_No drift check yet._'
+    predictions = report['predictions']
+    mix = ', '.join(f'{c} {pct}% (baseline {predictions["baseline_mix_pct"][c]}%)'
+                    for c, pct in predictions['mix_pct'].items())
+    lines = [
+        f"{report['surveys']:,} surveys, checked {report['checked']}"
+        + (f" (nothing is flagged before {MIN_SURVEYS:,})" if report['surveys'] < MIN_SURVEYS else ''),
+        '',
+        f"- drifted: {', '.join(report['drifted']) or 'none'}",
+        f"- warnings: {', '.join(report['warnings']) or 'none'}",
+        f"- predicted classes ({predictions['status']}, PSI {predictions['psi']}): {mix}",
+        '',
+        '| input | psi | status | missing/unknown % |',
+        '|---|---|---|---|',
+    ]
+    features = sorted(report['features'].items(), key=lambda item: -item[1]['psi'])
+    for col, f in features:
+        lines.append(f"| {col} | {f['psi']} | {f['status']} | "
+                     f"{f.get('missing_pct', f.get('unknown_pct'))} |")
+    return '\n'.join(lines)
+
+
+def load_monitor(path=DRIFT_BASELINE_PATH, check_every=DEFAULT_CHECK_EVERY):
+    """DriftMonitor for the saved baseline, or None when there is no baseline."""
+    if not os.path.exists(path):
+        return None
+    return DriftMonitor(load_baseline(path), check_every, os.environ.get(REPORT_ENV))
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the drift baseline from the training split.')
+    parser.add_argument('--data', default=CSV_PATH, help='airline.csv')
+    parser.add_argument('--model', help='model bundle directory or pickled DecisionTreeClassifier '
+                                        '(default: the bundle if present, else the pickle)')
+    parser.add_argument('-o', '--output', default=DRIFT_BASELINE_PATH)
+    args = parser.parse_args()
+
+    n_rows = write_baseline(args.data, args.model, args.output)
+    print(f'Wrote {args.output} from {n_rows:,} training rows')
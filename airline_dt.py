@@ -1,12 +1,15 @@
 # Import libraries
 import streamlit as st
-import pandas as pd
-import pickle
 import warnings
-import numpy as np
 warnings.filterwarnings('ignore')
 
-import random
+from airline_resources import get_drift_monitor, get_encoder, get_prediction_cache, get_stats
+from airline_stats import age_group
+from airline_timing import start_rerun, timing_enabled
+from airline_ui import bulk_scoring, debug_panel, show_explanation, show_whatif
+
+# Stage timings for the debug panel (AIRLINE_TIMING=1 or ?debug=1); no-ops otherwise
+timer = start_rerun(timing_enabled() or st.query_params.get('debug') == '1')
 
 st.title( 'Airline Customer Satisfaction') 
 st.write('**Gain insights into passenger experiences and improe satisfaction through' \
@@ -28,10 +31,8 @@ st.title("Prediction of Customer Satisfaction" \
 st.info("ℹ️ Please fill out the survey form "
 "in the sidebar and click **Predict** to see the satisfaction prediction.")
 
-# Load the pre-trained model from the pickle file
-dt_airline = open('dt_airline.pickle', 'rb') 
-clf = pickle.load(dt_airline) 
-dt_airline.close()
+# NOTE: the pre-trained model is loaded on the first Predict click (see below),
+# so the sidebar renders without waiting for pandas/numpy or the model file
 
 
 
@@ -53,12 +54,11 @@ dt_airline.close()
 # Using Default (Original) Dataset to Automate Few Items
 #---------------------------------------------------------------------------------------------
 
-# Load the default dataset
-default_df = pd.read_csv('airline.csv')
-# default_df = default_df.dropna().reset_index(drop = True) 
-default_df.dropna(inplace = True)
-# NOTE: drop = True is used to avoid adding a new column for old index
-noprice =  default_df.drop(columns = ['satisfaction'])
+# Precomputed from the cleaned default dataset and read from airline_meta.json:
+# category lists, numeric bounds and the comparison percentages
+timer.checkpoint('header')
+with timer.stage('data_load'):
+    stats = get_stats()
 
 
 
@@ -71,16 +71,16 @@ st.sidebar.write('Provide Information about the customer flying')
 # travel_type_ORDER = ["Personal Travel", "Business Travel"]
 # class_ORDER = ["Eco", "Eco Plus", "Business"]
 
-customer_type = st.sidebar.selectbox("What type of customer is this?", default_df['customer_type'].unique())
-type_of_travel = st.sidebar.selectbox("Is the customer travelling for business or personal reasons?", default_df['type_of_travel'].unique())
+customer_type = st.sidebar.selectbox("What type of customer is this?", stats.levels('customer_type'))
+type_of_travel = st.sidebar.selectbox("Is the customer travelling for business or personal reasons?", stats.levels('type_of_travel'))
 class_type = st.sidebar.selectbox(      # ✅ use a new variable
     "In which class will the customer be flying?",
-    default_df['class'].unique()
+    stats.levels('class')
 )
 age = st.sidebar.number_input(
     'How old is the customer?',
-    min_value=int(default_df['age'].min()),
-    max_value=int(default_df['age'].max()),
+    min_value=stats.bounds('age')[0],
+    max_value=stats.bounds('age')[1],
     step=1
 )
 
@@ -88,18 +88,18 @@ st.sidebar.subheader('Part 2: Flight Details')
 st.sidebar.write("Provide details about the customer's flight details")
 
 miles = st.sidebar.number_input('How far is the customer flying in miles?',
-    min_value=int(default_df['flight_distance'].min()),
-    max_value=int(default_df['flight_distance'].max()),
+    min_value=stats.bounds('flight_distance')[0],
+    max_value=stats.bounds('flight_distance')[1],
     step=1
 )
 departure_delay_in_minutes = st.sidebar.number_input('How many minutes was the customer’s departure delayed? (Enter 0 if not delayed)',
-    min_value=int(default_df['departure_delay_in_minutes'].min()),
-    max_value=int(default_df['departure_delay_in_minutes'].max()),
+    min_value=stats.bounds('departure_delay_in_minutes')[0],
+    max_value=stats.bounds('departure_delay_in_minutes')[1],
     step=1
 )
 arrival_delay_in_minutes = st.sidebar.number_input('How many minutes was the customer’s arrival delayed? (Enter 0 if not delayed)',
-    min_value=int(default_df['arrival_delay_in_minutes'].min()),
-    max_value=int(default_df['arrival_delay_in_minutes'].max()),
+    min_value=stats.bounds('arrival_delay_in_minutes')[0],
+    max_value=stats.bounds('arrival_delay_in_minutes')[1],
     step=1
 )
 
@@ -122,72 +122,61 @@ online_boarding = st.sidebar.radio("Online boarding (1–5 stars)", [1, 2, 3, 4,
 departure_arrival_time_convenient = st.sidebar.radio("Departure/arrival time convenience (1–5 stars)", [1, 2, 3, 4, 5], horizontal=True)
 
 # ✅ Button at the bottom (no form)
+whatif_mode = st.sidebar.checkbox("🔀 Also show which rating changes would flip the prediction")
 predict_button = st.sidebar.button("✈️ Predict Satisfaction")
+timer.checkpoint('widgets')
 if predict_button:
     st.success("Prediction executed successfully!")
 
-    # Copy base dataframe (no target column)
-    encode_df = default_df.drop(columns=['satisfaction']).copy()
-
-    # --- Append user input row in the same order as model training ---
-    encode_df.loc[len(encode_df)] = [
-        customer_type,                  # customer_type
-        type_of_travel,                 # type_of_travel
-        class_type,                     # class
-        age,                            # age
-        miles,                          # flight_distance
-        departure_delay_in_minutes,     # departure_delay_in_minutes
-        arrival_delay_in_minutes,       # arrival_delay_in_minutes
-        seat_comfort,                   # seat_comfort
-        food_and_drink,                 # food_and_drink
-        gate_location,                  # gate_location
-        inflight_wifi_service,          # inflight_wifi_service
-        inflight_entertainment,         # inflight_entertainment
-        online_support,                 # online_support
-        ease_of_online_booking,         # ease_of_online_booking
-        on_board_service,               # on-board_service
-        leg_room_service,               # leg_room_service
-        baggage_handling,               # baggage_handling
-        checkin_service,                # checkin_service
-        cleanliness,                    # cleanliness
-        online_boarding,                # online_boarding
-        departure_arrival_time_convenient  # departure_arrival_time_convenient
-    ]
-
-    # --- Normalize categorical text for exact matching ---
-    for col in ['customer_type', 'type_of_travel', 'class']:
-        encode_df[col] = encode_df[col].astype(str).str.strip().str.title()
-
-    # --- One-hot encode only categorical columns ---
-    encode_dummy_df = pd.get_dummies(encode_df, columns=['customer_type', 'type_of_travel', 'class'])
-
-    # --- Extract just the user’s row ---
-    user_encoded_df = encode_dummy_df.tail(1)
-
-# --- Align columns with model training order ---
-    user_encoded_df = user_encoded_df.reindex(columns=clf.feature_names_in_, fill_value=0)
-
-# --- Explicitly convert every column to float ---
-    for col in user_encoded_df.columns:
-        try:
-            user_encoded_df[col] = user_encoded_df[col].astype(float)
-        except Exception:
-            # if somehow a value cannot be converted, fill with 0
-            user_encoded_df[col] = pd.to_numeric(user_encoded_df[col], errors='coerce').fillna(0)
-
-
-    # --- Sanity check before prediction ---
-    non_numeric = user_encoded_df.select_dtypes(exclude=['number']).columns
-    if len(non_numeric) > 0:
-        st.error(f"Non-numeric columns remain: {list(non_numeric)}")
-        st.stop()
+    # --- Collect user input keyed by the training column names ---
+    survey = {
+        'customer_type': customer_type,
+        'type_of_travel': type_of_travel,
+        'class': class_type,
+        'age': age,
+        'flight_distance': miles,
+        'departure_delay_in_minutes': departure_delay_in_minutes,
+        'arrival_delay_in_minutes': arrival_delay_in_minutes,
+        'seat_comfort': seat_comfort,
+        'food_and_drink': food_and_drink,
+        'gate_location': gate_location,
+        'inflight_wifi_service': inflight_wifi_service,
+        'inflight_entertainment': inflight_entertainment,
+        'online_support': online_support,
+        'ease_of_online_booking': ease_of_online_booking,
+        'on-board_service': on_board_service,
+        'leg_room_service': leg_room_service,
+        'baggage_handling': baggage_handling,
+        'checkin_service': checkin_service,
+        'cleanliness': cleanliness,
+        'online_boarding': online_boarding,
+        'departure_arrival_time_convenient': departure_arrival_time_convenient,
+    }
+
+    # Load the pre-trained model (cached once per process, shared across reruns and sessions)
+    # and compile it to flat arrays for single-row inference
+    with timer.stage('model_load'):
+        # Repeat surveys are served from an LRU cache scoped to the model version
+        predictions = get_prediction_cache()
+        # Encoder built once from clf.feature_names_in_ (replaces copy + get_dummies per click)
+        encoder = get_encoder()
+
+    # --- One-hot encode and align with model training order (all floats) ---
+    with timer.stage('encode'):
+        user_encoded = encoder.encode(survey)
 
     # ✅ --- Now predict safely ---
     try:
-        predicted_satisfaction = clf.predict(user_encoded_df)[0]
-        predicted_proba = clf.predict_proba(user_encoded_df)[0]
+        with timer.stage('inference'):
+            predicted_satisfaction, predicted_proba, explanation = predictions.explain_one(user_encoded)
         confidence = max(predicted_proba) * 100
 
+        # Scored surveys feed the process-wide drift monitor (constant cost per prediction)
+        with timer.stage('drift_update'):
+            monitor = get_drift_monitor()
+            if monitor is not None:
+                monitor.update(survey, predicted_satisfaction)
+
         # --- Format the prediction nicely ---
         # Define color depending on satisfaction
         color = "green" if predicted_satisfaction.lower() == "satisfied" else "red"
@@ -215,10 +204,20 @@ if predict_button:
             """,
             unsafe_allow_html=True
         )
+        timer.checkpoint('render_prediction')
+
+        # --- Why this prediction? Decision path and contributions from the same tree walk ---
+        show_explanation(explanation, predicted_satisfaction, timer)
+
+        # --- What-if: every single and pairwise rating change, scored in one batch ---
+        if whatif_mode:
+            show_whatif(encoder, survey, timer)
 
 
     except Exception as e:
         st.error(f"Prediction failed: {e}")
+        import pandas as pd
+        user_encoded_df = pd.DataFrame([user_encoded], columns=encoder.feature_names)
         st.write("DEBUG: user_encoded_df dtypes:")
         st.write(user_encoded_df.dtypes)
         st.write("DEBUG: user_encoded_df sample row:")
@@ -303,30 +302,39 @@ if predict_button:
 #         unsafe_allow_html=True
 #     )
 
-with st.expander("🧍 Customer Type Comparison"):
-    pct = (default_df['customer_type'] == customer_type).mean() * 100
+with timer.stage('expander.customer_type'), st.expander("🧍 Customer Type Comparison"):
+    pct = stats.category_pct('customer_type', customer_type)
     st.write(f"**Your selection:** {customer_type}")
     st.write(f"Percentage of our flyers with this selection: {pct:.1f}%")
 
-with st.expander("🧳 Type of Travel Comparison"):
-    pct = (default_df['type_of_travel'] == type_of_travel).mean() * 100
+with timer.stage('expander.type_of_travel'), st.expander("🧳 Type of Travel Comparison"):
+    pct = stats.category_pct('type_of_travel', type_of_travel)
     st.write(f"**Your selection:** {type_of_travel}")
     st.write(f"Percentage of our flyers with this selection: {pct:.1f}%")
 
-with st.expander("💺 Flight Class Comparison"):
-    pct = (default_df['class']==class_type).mean() * 100
+with timer.stage('expander.class'), st.expander("💺 Flight Class Comparison"):
+    pct = stats.category_pct('class', class_type)
     st.write(f"**Your selection:** {class_type}")
     st.write(f"Percentage of our flyers with this selection: {pct:.1f}%")
 
-with st.expander("🎂 Age Group Comparison"):
-    # Example: group by age range
-    bins = [0, 18, 30, 45, 60, 75, 100]
-    labels = ['Under 18', '18–30', '31–45', '46–60', '61–75', '76+']
-    default_df['age_group'] = pd.cut(default_df['age'], bins=bins, labels=labels, right=False)
-    
-    # Compute user's age group
-    user_age_group = pd.cut([age], bins=bins, labels=labels, right=False)[0]
-    pct = (default_df['age_group'] == user_age_group).mean() * 100
+with timer.stage('expander.age_group'), st.expander("🎂 Age Group Comparison"):
+    # Compute user's age group (age buckets are precomputed in stats)
+    user_age_group = age_group(age)
+    pct = stats.age_group_pct(user_age_group)
 
     st.write(f"**Your age group:** {user_age_group}")
     st.write(f"Percentage of our flyers in this group: {pct:.1f}%")
+
+# Score a whole survey export (same columns as airline.csv) in chunks
+with timer.stage('bulk_scoring'):
+    bulk_scoring(stats)
+
+# ⏱️ Debug panel: per-stage timings for this rerun, this session and the whole process
+if timer.enabled:
+    def show_encoded():
+        if predict_button:
+            # Encoded row the model saw (replaces the ad hoc dtypes dump)
+            st.write("DEBUG: encoded survey:")
+            st.json(dict(zip(encoder.feature_names, map(float, user_encoded))))
+
+    debug_panel(timer, 'airline_dt.py', predict_button, extra=show_encoded)
@@ -0,0 +1,272 @@
+# ===========================================
+# 🧵 BACKGROUND SCORING JOBS
+# ===========================================
+# Scores survey files on a small pool of worker threads so a large upload
+# never blocks the Streamlit rerun that submitted it. Jobs advance one chunk
+# at a time and the workers serve sessions in turn (round robin), so one
+# huge file cannot starve the other sessions' jobs. Each job reports its
+# progress and per-chunk throughput, and writes its results to a temporary
+# CSV that the app offers for download when the job is done. Finished jobs
+# (and their CSVs) are deleted after FINISHED_JOB_TTL, whether or not their
+# session is still open, and the temporary directory is removed at exit.
+#
+# Threads rather than processes: the chunk work is mostly pandas parsing and
+# numpy, which release the GIL, and results stay on the local disk.
+
+import atexit
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+
+from airline_batch import PREDICTION_COL, encode_chunks, score_encoded
+from airline_data import DEFAULT_CHUNKSIZE
+
+DEFAULT_WORKERS = 2
+
+# Finished jobs kept per session (older results are deleted)
+MAX_JOBS_PER_SESSION = 20
+# Seconds a finished job's results stay downloadable
+FINISHED_JOB_TTL = 3600
+# How often idle workers look for expired jobs
+PRUNE_INTERVAL = 60
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+
+
+class ScoringJob:
+    """One submitted file and its progress; advanced a chunk at a time."""
+
+    def __init__(self, job_id, session, name, source, encoder, tree, size=None, row_filter=None,
+                 monitor=None):
+        self.id = job_id
+        self.session = session
+        self.name = name
+        self.status = QUEUED
+        self.error = None
+        self.rows = 0
+        self.skipped = 0
+        self.chunks = 0
+        self.submitted = time.time()
+        self.finished_at = None
+        self.seconds = 0.0
+        self.rows_per_sec = 0.0
+        self.chunk_rows_per_sec = 0.0
+        self.result_path = None
+
+        self._source = source
+        self._size = size
+        self._row_filter = row_filter or {}
+        self._encoder = encoder
+        self._tree = tree
+        self._monitor = monitor
+        self._chunks = None
+        self._out = None
+        self._work_seconds = 0.0
+        self._started = None
+        self._cancel = False
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def progress(self):
+        """Fraction of the input read so far (from the file position), 0–1."""
+        if self.status == DONE:
+            return 1.0
+        if not self._size or self._out is None:
+            return 0.0
+        try:
+            position = self._source.tell() if hasattr(self._source, 'tell') else None
+        except (OSError, ValueError):
+            position = None
+        return min(position / self._size, 0.99) if position is not None else 0.0
+
+    def snapshot(self):
+        return {
+            'id': self.id, 'name': self.name, 'status': self.status, 'error': self.error,
+            'progress': self.progress(), 'rows': self.rows, 'skipped': self.skipped,
+            'chunks': self.chunks, 'seconds': self.seconds, 'rows_per_sec': self.rows_per_sec,
+            'chunk_rows_per_sec': self.chunk_rows_per_sec, 'result_path': self.result_path,
+        }
+
+    def _filter(self, chunk, X):
+        if not self._row_filter:
+            return chunk, X
+        mask = None
+        for col, values in self._row_filter.items():
+            col_mask = chunk[col].isin(values)
+            mask = col_mask if mask is None else mask & col_mask
+        rows = mask.to_numpy()
+        return chunk[rows], X[rows]
+
+    def step(self, job_dir, chunksize):
+        """Score the next chunk; returns False once the job has finished."""
+        start = time.perf_counter()
+        if self._chunks is None:
+            self.status = RUNNING
+            self._started = time.time()
+            if isinstance(self._source, str):
+                self._size = self._size or os.path.getsize(self._source)
+                self._source = open(self._source, 'rb')
+            self._chunks = encode_chunks(self._source, self._encoder, chunksize)
+            self.result_path = os.path.join(job_dir, f'{self.id}.csv')
+            self._out = open(self.result_path, 'w', newline='', encoding='utf-8')
+
+        try:
+            rows_read, chunk, X = next(self._chunks)
+        except StopIteration:
+            self._close(DONE)
+            return False
+
+        scored = score_encoded(*self._filter(chunk, X), self._tree)
+        scored.to_csv(self._out, header=(self.chunks == 0), index=False)
+        if self._monitor is not None:
+            self._monitor.update_frame(scored, scored[PREDICTION_COL])
+
+        elapsed = time.perf_counter() - start
+        self.chunks += 1
+        self.rows += len(scored)
+        self.skipped += rows_read - len(chunk)
+        self._work_seconds += elapsed
+        self.seconds = time.time() - self._started
+        self.rows_per_sec = self.rows / self._work_seconds if self._work_seconds else 0.0
+        self.chunk_rows_per_sec = rows_read / elapsed if elapsed else 0.0
+        return True
+
+    def _close(self, status, error=None):
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self.seconds = time.time() - self._started if self._started else 0.0
+        for handle in (self._out, self._source):
+            if hasattr(handle, 'close'):
+                handle.close()
+        self._chunks = None
+        self._source = None
+
+
+class JobQueue:
+    """Worker threads that advance queued jobs chunk by chunk, sessions in turn."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, chunksize=DEFAULT_CHUNKSIZE, job_dir=None,
+                 ttl=FINISHED_JOB_TTL):
+        self.chunksize = chunksize
+        self.ttl = ttl
+        self.job_dir = job_dir or tempfile.mkdtemp(prefix='airline_jobs_')
+        self._jobs = {}
+        # {session: deque of runnable jobs}; the order sessions are served in
+        self._runnable = OrderedDict()
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._closed = False
+        self._threads = [threading.Thread(target=self._work, name=f'airline-job-{i}', daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+        atexit.register(self.shutdown)
+
+    def submit(self, session, source, name, encoder, tree, size=None, row_filter=None, monitor=None):
+        """Queue ``source`` (path or file object) for scoring; returns the job id.
+
+        ``row_filter`` ({column: allowed values}) scores only a slice of the
+        cleaned rows. ``size`` (bytes) lets file objects report progress.
+        A DriftMonitor ``monitor`` sees every scored chunk.
+        """
+        with self._cond:
+            job = ScoringJob(f'job{next(self._ids)}', session, name, source, encoder, tree,
+                             size, row_filter, monitor)
+            self._jobs[job.id] = job
+            self._runnable.setdefault(session, deque()).append(job)
+            self._prune(session)
+            self._cond.notify()
+        return job.id
+
+    def jobs(self, session):
+        """Snapshots of a session's jobs, newest first."""
+        with self._cond:
+            self._prune_expired()
+            jobs = [job for job in self._jobs.values() if job.session == session]
+        return [job.snapshot() for job in reversed(jobs)]
+
+    def cancel(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return
+            queue = self._runnable.get(job.session)
+            if queue is not None and job in queue:
+                queue.remove(job)
+                job._close(CANCELLED)
+            else:
+                job._cancel = True  # being scored: stops after its current chunk
+
+    def shutdown(self):
+        """Stop the workers, cancel unfinished jobs and delete every result."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        for job in self._jobs.values():
+            if not job.finished:
+                job._close(CANCELLED)
+        self._jobs.clear()
+        self._runnable.clear()
+        shutil.rmtree(self.job_dir, ignore_errors=True)
+        atexit.unregister(self.shutdown)
+
+    def _drop(self, job):
+        del self._jobs[job.id]
+        if job.result_path and os.path.exists(job.result_path):
+            os.remove(job.result_path)
+
+    def _prune(self, session):
+        finished = [job for job in self._jobs.values() if job.session == session and job.finished]
+        for job in finished[:max(0, len(finished) - MAX_JOBS_PER_SESSION)]:
+            self._drop(job)
+
+    def _prune_expired(self):
+        # Every session's finished jobs, including sessions that have ended
+        cutoff = time.time() - self.ttl
+        for job in [job for job in self._jobs.values() if job.finished and job.finished_at < cutoff]:
+            self._drop(job)
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                for session in list(self._runnable):
+                    queue = self._runnable[session]
+                    if not queue:
+                        del self._runnable[session]
+                        continue
+                    # This session goes to the back of the line
+                    self._runnable.move_to_end(session)
+                    return queue.popleft()
+                self._prune_expired()
+                self._cond.wait(PRUNE_INTERVAL)
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                more = not job._cancel and job.step(self.job_dir, self.chunksize)
+            except Exception as e:
+                job._close(FAILED, f'{type(e).__name__}: {e}')
+                more = False
+            if job._cancel and not job.finished:
+                job._close(CANCELLED)
+                more = False
+            if more:
+                with self._cond:
+                    self._runnable.setdefault(job.session, deque()).append(job)
+                    self._cond.notify()
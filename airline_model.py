@@ -0,0 +1,586 @@
+# ===========================================
+# 🧠 AIRLINE MODEL HELPERS
+# ===========================================
+# Shared by the apps, the batch scorer and the prediction service: survey
+# encoding, the compiled (flat-array) tree and the on-disk model bundle.
+
+import json
+import os
+import shutil
+import threading
+import warnings
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from airline_data import load_model
+from airline_schema import BUNDLE_PATH, CATEGORICAL_COLS, MANIFEST_NAME, MODEL_PATH, file_digest
+
+
+def normalize_level(value):
+    """Normalize categorical text the same way the apps clean the dataset."""
+    return str(value).strip().title()
+
+
+# -------------------------------------------
+# 🧩 Survey Encoder
+# -------------------------------------------
+class SurveyEncoder:
+    """Encode one survey dict straight into the model's feature order.
+
+    Equivalent to appending the row to the dataset, running
+    ``pd.get_dummies`` and reindexing on ``clf.feature_names_in_``, but the
+    cost no longer depends on the size of the dataset.
+    """
+
+    def __init__(self, feature_names, categorical_cols=CATEGORICAL_COLS):
+        self.feature_names = [str(name) for name in feature_names]
+        self.categorical_cols = list(categorical_cols)
+
+        # Plain numeric features: (position in vector, survey column)
+        self._numeric = []
+        # Dummy features: {column: {normalized level: position in vector}}
+        self._levels = {col: {} for col in self.categorical_cols}
+
+        for pos, name in enumerate(self.feature_names):
+            for col in self.categorical_cols:
+                prefix = col + '_'
+                if name.startswith(prefix):
+                    self._levels[col][normalize_level(name[len(prefix):])] = pos
+                    break
+            else:
+                self._numeric.append((pos, name))
+
+    @classmethod
+    def from_model(cls, clf):
+        return cls(clf.feature_names_in_)
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    def levels(self, col):
+        """Categorical levels the model knows for ``col`` (normalized)."""
+        return list(self._levels[col])
+
+    def encode(self, survey):
+        """Return a float64 vector for one survey (dict of raw column -> value).
+
+        Unknown categorical levels leave every dummy for that column at 0,
+        which is what ``reindex(..., fill_value=0)`` did in the apps.
+        """
+        row = np.zeros(self.n_features, dtype=np.float64)
+        for pos, col in self._numeric:
+            row[pos] = float(survey[col])
+        for col, levels in self._levels.items():
+            pos = levels.get(normalize_level(survey[col]))
+            if pos is not None:
+                row[pos] = 1.0
+        return row
+
+    def encode_frame(self, survey):
+        """Same as ``encode`` but as a one-row DataFrame with feature names."""
+        return pd.DataFrame([self.encode(survey)], columns=self.feature_names)
+
+    def encode_batch(self, df):
+        """Encode every row of a raw survey DataFrame into a 2-D float64 array.
+
+        ``df`` has the airline.csv columns (extra columns are ignored) and no
+        missing values in the model inputs.
+        """
+        X = np.zeros((len(df), self.n_features), dtype=np.float64)
+        for pos, col in self._numeric:
+            X[:, pos] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)
+        for col, levels in self._levels.items():
+            normalized = df[col].astype(str).str.strip().str.title().to_numpy()
+            for level, pos in levels.items():
+                X[:, pos] = normalized == level
+        return X
+
+
+# -------------------------------------------
+# 🌳 Compiled Decision Tree
+# -------------------------------------------
+class CompiledTree:
+    """Flat-array copy of a fitted DecisionTreeClassifier.
+
+    Returns the class and the class probabilities from a single walk of the
+    tree, without sklearn's per-call input validation. Leaves point back at
+    themselves, so a batch can be advanced level by level for ``max_depth``
+    steps with no per-row branching.
+    """
+
+    # Array name -> dtype; also the file layout of a model bundle
+    ARRAYS = {
+        'children_left': np.int32,
+        'children_right': np.int32,
+        'feature': np.int32,
+        'threshold': np.float64,
+        'proba': np.float64,
+        'leaf_class': np.int32,
+    }
+
+    def __init__(self, children_left, children_right, feature, threshold, proba, classes,
+                 leaf_class=None, max_depth=None):
+        # Arrays that already have the right dtype (e.g. memory-mapped from a
+        # bundle) are used as-is, without a copy
+        self.children_left = np.ascontiguousarray(children_left, dtype=np.int32)
+        self.children_right = np.ascontiguousarray(children_right, dtype=np.int32)
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.proba = np.ascontiguousarray(proba, dtype=np.float64)
+        self.classes = np.asarray(classes)
+
+        if leaf_class is None:
+            leaf_class = np.argmax(self.proba, axis=1)
+        self.leaf_class = np.ascontiguousarray(leaf_class, dtype=np.int32)
+        self.max_depth = self._depth() if max_depth is None else max_depth
+
+        self._lists = None
+
+    @classmethod
+    def from_sklearn(cls, clf):
+        tree = clf.tree_
+        left = tree.children_left.copy()
+        right = tree.children_right.copy()
+        feature = tree.feature.copy()
+        threshold = tree.threshold.copy()
+
+        # Leaves loop back to themselves (sklearn marks them with -1/-2)
+        leaves = left == -1
+        nodes = np.arange(tree.node_count)
+        left[leaves] = nodes[leaves]
+        right[leaves] = nodes[leaves]
+        feature[leaves] = 0
+        threshold[leaves] = np.inf
+
+        value = tree.value[:, 0, :]
+        proba = value / value.sum(axis=1, keepdims=True)
+        return cls(left, right, feature, threshold, proba, clf.classes_)
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    def _depth(self):
+        depth = 0
+        level = np.zeros(1, dtype=np.int32)
+        while True:
+            inner = level[self.children_left[level] != level]
+            if not len(inner):
+                return depth
+            level = np.concatenate([self.children_left[inner], self.children_right[inner]])
+            depth += 1
+
+    def arrays(self):
+        """{name: array} for every array in ARRAYS."""
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    def apply_one(self, row):
+        """Leaf index for one encoded row."""
+        if self._lists is None:
+            # Plain lists are much faster than numpy scalars for one row at a
+            # time; built on first use so batch-only processes never pay for them
+            self._lists = (self.children_left.tolist(), self.children_right.tolist(),
+                           self.feature.tolist(), self.threshold.tolist())
+        left, right, feature, threshold = self._lists
+
+        # sklearn compares float32 inputs against the float64 thresholds
+        row = np.asarray(row, dtype=np.float32).tolist()
+        node = 0
+        while left[node] != node:
+            if row[feature[node]] <= threshold[node]:
+                node = left[node]
+            else:
+                node = right[node]
+        return node
+
+    def apply(self, X):
+        """Leaf index for every row of a 2-D encoded array."""
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))
+        node = np.zeros(len(X), dtype=np.int32)
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.children_left[node], self.children_right[node])
+        return node
+
+    def predict_leaf(self, leaf):
+        """(label, probabilities) stored at a leaf index."""
+        return self.classes[self.leaf_class[leaf]], self.proba[leaf]
+
+    def predict_one(self, row):
+        """(label, probabilities) for one encoded row."""
+        return self.predict_leaf(self.apply_one(row))
+
+    def predict(self, X):
+        """(labels, probabilities) for a batch of encoded rows."""
+        leaves = self.apply(X)
+        return self.classes[self.leaf_class[leaves]], self.proba[leaves]
+
+
+# -------------------------------------------
+# 🔍 Prediction Explanations
+# -------------------------------------------
+class TreeExplainer:
+    """Decision path and per-feature contributions for single predictions.
+
+    Every split moves the class probabilities from the parent node's to the
+    child's; that change is credited to the split's feature, so the root's
+    probability plus all contributions equals the predicted probability.
+    The per-node changes are computed once here. A leaf's path is built the
+    first time it is reached and reused, so explaining a prediction only
+    reads tables for the leaf the prediction already walked to.
+    """
+
+    def __init__(self, tree, encoder):
+        self.tree = tree
+        self.feature_names = encoder.feature_names
+
+        nodes = np.arange(tree.node_count)
+        left = np.asarray(tree.children_left)
+        right = np.asarray(tree.children_right)
+        inner = left != nodes
+        self.parent = np.full(tree.node_count, -1, dtype=np.int32)
+        self.parent[left[inner]] = nodes[inner]
+        self.parent[right[inner]] = nodes[inner]
+
+        # Change in class probabilities on entering each node (0 at the root)
+        proba = np.asarray(tree.proba)
+        self.delta = proba - proba[np.maximum(self.parent, 0)]
+        self.delta[0] = 0.0
+
+        # Feature position -> (survey column, dummy level or None)
+        self._sources = {pos: (col, None) for pos, col in encoder._numeric}
+        for col, levels in encoder._levels.items():
+            for level, pos in levels.items():
+                self._sources[pos] = (col, level)
+
+        self._paths = {}
+
+    def _condition(self, feature, threshold, went_left):
+        col, level = self._sources[feature]
+        if level is not None:
+            # One-hot dummy: <= 0.5 means the survey is not this level
+            return f"{col} is {'not ' if went_left else ''}{level}"
+        return f"{col} {'≤' if went_left else '>'} {threshold:g}"
+
+    def _leaf_path(self, leaf):
+        path = self._paths.get(leaf)
+        if path is None:
+            nodes = [leaf]
+            while self.parent[nodes[-1]] >= 0:
+                nodes.append(int(self.parent[nodes[-1]]))
+            nodes.reverse()
+
+            cls = int(self.tree.leaf_class[leaf])
+            steps = []
+            contributions = {}
+            for node, child in zip(nodes[:-1], nodes[1:]):
+                feature = int(self.tree.feature[node])
+                went_left = int(self.tree.children_left[node]) == child
+                contribution = float(self.delta[child, cls])
+                col = self._sources[feature][0]
+                steps.append({
+                    'feature': self.feature_names[feature],
+                    'condition': self._condition(feature, float(self.tree.threshold[node]), went_left),
+                    'contribution': contribution,
+                    '_position': feature,
+                })
+                contributions[col] = contributions.get(col, 0.0) + contribution
+
+            contributions = dict(sorted(contributions.items(), key=lambda item: -abs(item[1])))
+            path = (float(self.tree.proba[0, cls]), steps, contributions)
+            self._paths[leaf] = path
+        return path
+
+    def explain_leaf(self, row, leaf):
+        """Explanation dict for an encoded ``row`` that reached ``leaf``.
+
+        ``base``: probability of the predicted class at the root (all training
+        passengers); ``steps``: the splits on the decision path with the
+        survey's value and each split's contribution; ``contributions``: the
+        same contributions summed per survey column, largest first.
+        """
+        base, steps, contributions = self._leaf_path(leaf)
+        return {
+            'base': base,
+            'steps': [
+                {'feature': step['feature'], 'condition': step['condition'],
+                 'value': float(row[step['_position']]), 'contribution': step['contribution']}
+                for step in steps
+            ],
+            'contributions': contributions,
+        }
+
+    def explain_one(self, row):
+        """(label, probabilities, explanation) from one tree walk."""
+        leaf = self.tree.apply_one(row)
+        label, proba = self.tree.predict_leaf(leaf)
+        return label, proba, self.explain_leaf(row, leaf)
+
+
+# -------------------------------------------
+# 🗃️ Prediction Cache
+# -------------------------------------------
+DEFAULT_CACHE_SIZE = 4096
+
+
+class PredictionCache:
+    """Bounded LRU of the leaf each encoded survey reaches.
+
+    The key is the row as float32 bytes, which is exactly what the tree
+    compares, so identical keys always reach the same leaf. Create one cache
+    per model version; it never checks the tree. Safe to share between
+    sessions (threads). explain_one needs an ``explainer``, or an
+    ``encoder`` to build one from on first use.
+    """
+
+    def __init__(self, tree, maxsize=DEFAULT_CACHE_SIZE, version=None, explainer=None, encoder=None):
+        self.tree = tree
+        self.maxsize = maxsize
+        self.version = version
+        self.explainer = explainer
+        self.encoder = encoder
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def leaf_one(self, row):
+        """Leaf index for one encoded row, from the cache when possible."""
+        key = np.asarray(row, dtype=np.float32).tobytes()
+        with self._lock:
+            leaf = self._entries.get(key)
+            if leaf is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return leaf
+            self.misses += 1
+
+        leaf = self.tree.apply_one(row)
+        with self._lock:
+            self._entries[key] = leaf
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return leaf
+
+    def predict_one(self, row):
+        """(label, probabilities) for one encoded row."""
+        return self.tree.predict_leaf(self.leaf_one(row))
+
+    def explain_one(self, row):
+        """(label, probabilities, explanation) from the same (cached) tree walk."""
+        if self.explainer is None:
+            if self.encoder is None:
+                raise ValueError('PredictionCache.explain_one needs an explainer or an encoder')
+            with self._lock:
+                if self.explainer is None:
+                    self.explainer = TreeExplainer(self.tree, self.encoder)
+        leaf = self.leaf_one(row)
+        label, proba = self.tree.predict_leaf(leaf)
+        return label, proba, self.explainer.explain_leaf(row, leaf)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Size, hit/miss counts and hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': self.version,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+
+# -------------------------------------------
+# 📦 Model Bundle
+# -------------------------------------------
+# A directory holding the compiled tree as raw .npy arrays (opened with mmap,
+# so worker processes share the same physical pages) plus manifest.json with
+# the feature order, category vocabularies, class labels and test metrics.
+BUNDLE_FORMAT = 1
+
+
+class ModelBundle:
+    """A loaded bundle: manifest dict, SurveyEncoder and CompiledTree."""
+
+    def __init__(self, path, manifest, encoder, tree):
+        self.path = path
+        self.manifest = manifest
+        self.encoder = encoder
+        self.tree = tree
+
+    @property
+    def metrics(self):
+        return self.manifest.get('metrics')
+
+
+def read_class_report(path):
+    """class_report.csv from the notebook as {column: {metric: value}}."""
+    return pd.read_csv(path, index_col=0).to_dict()
+
+
+def pickled_sklearn_version(model_path):
+    """scikit-learn version a pickled estimator was saved (trained) with.
+
+    sklearn drops the version from the estimator on unpickling and only
+    reports it in the InconsistentVersionWarning for a mismatch.
+    """
+    import sklearn
+    from sklearn.exceptions import InconsistentVersionWarning
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', InconsistentVersionWarning)
+        load_model(model_path)
+    for warning in caught:
+        if issubclass(warning.category, InconsistentVersionWarning):
+            return warning.message.original_sklearn_version
+    return sklearn.__version__
+
+
+def save_bundle(clf, path, report_path=None, model_path=None):
+    """Write ``clf`` as a model bundle directory at ``path``.
+
+    ``model_path`` is the pickle ``clf`` was saved to; its digest is recorded
+    so a replaced pickle is noticed (see bundle_is_current), and so is the
+    sklearn version it was trained with, next to the one exporting it.
+
+    The bundle is built in a sibling temporary directory and swapped in by
+    rename, so processes that have the old arrays memory-mapped keep reading
+    their (now unlinked) files instead of seeing them change underneath them.
+    """
+    import sklearn
+
+    # A symlinked bundle path keeps pointing at the swapped-in directory
+    path = os.path.realpath(path)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    encoder = SurveyEncoder.from_model(clf)
+    tree = CompiledTree.from_sklearn(clf)
+
+    arrays = {}
+    for name, array in tree.arrays().items():
+        filename = name + '.npy'
+        np.save(os.path.join(tmp_path, filename), array)
+        arrays[name] = {'file': filename, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'sklearn_version': sklearn.__version__,
+        'trained_sklearn_version': pickled_sklearn_version(model_path) if model_path else None,
+        'estimator': type(clf).__name__,
+        'feature_names': encoder.feature_names,
+        'categories': {col: encoder.levels(col) for col in encoder.categorical_cols},
+        'classes': [str(c) for c in tree.classes],
+        'node_count': tree.node_count,
+        'max_depth': tree.max_depth,
+        'arrays': arrays,
+        'metrics': read_class_report(report_path) if report_path else None,
+        'source': {'file': os.path.basename(model_path), 'sha256': file_digest(model_path)}
+        if model_path else None,
+    }
+    # Written last: a bundle directory with a manifest is complete
+    with open(os.path.join(tmp_path, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    old_path = f'{path}.{os.getpid()}.old'
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return manifest
+
+
+def load_bundle(path, mmap_mode='r'):
+    """Open a model bundle; arrays are memory-mapped read-only by default."""
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"{path}: unsupported bundle format {manifest.get('format')!r}")
+
+    arrays = {}
+    for name, meta in manifest['arrays'].items():
+        array = np.load(os.path.join(path, meta['file']), mmap_mode=mmap_mode)
+        if array.dtype.str != meta['dtype'] or list(array.shape) != meta['shape']:
+            raise ValueError(f'{path}: {name} does not match the manifest')
+        arrays[name] = array
+
+    tree = CompiledTree(classes=manifest['classes'], max_depth=manifest['max_depth'], **arrays)
+    encoder = SurveyEncoder(manifest['feature_names'])
+    return ModelBundle(path, manifest, encoder, tree)
+
+
+def is_bundle(path):
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def bundle_is_current(path=BUNDLE_PATH, model_path=MODEL_PATH):
+    """True when the bundle at ``path`` is an export of the pickle at ``model_path``.
+
+    A bundle deployed without its pickle counts as current; one that does
+    not record its source pickle does not.
+    """
+    if not is_bundle(path):
+        return False
+    if not os.path.exists(model_path):
+        return True
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        source = json.load(f).get('source')
+    return bool(source) and source.get('sha256') == file_digest(model_path)
+
+
+def load_predictor(path):
+    """(encoder, tree) from a model bundle directory or a pickled classifier."""
+    if is_bundle(path):
+        bundle = load_bundle(path)
+        return bundle.encoder, bundle.tree
+    clf = load_model(path)
+    return SurveyEncoder.from_model(clf), CompiledTree.from_sklearn(clf)
+
+
+def default_model_path():
+    """The bundle while it matches dt_airline.pickle, otherwise the pickle."""
+    return BUNDLE_PATH if bundle_is_current(BUNDLE_PATH, MODEL_PATH) else MODEL_PATH
+
+
+if __name__ == '__main__':
+    # Parity check: compiled tree vs sklearn on the notebook's held-out split
+    #   python airline_model.py
+    import time
+
+    from airline_data import holdout_split
+
+    clf = load_model()
+    encoder = SurveyEncoder.from_model(clf)
+    tree = CompiledTree.from_sklearn(clf)
+    _, test_df = holdout_split()
+    test_X = pd.DataFrame(encoder.encode_batch(test_df), columns=encoder.feature_names)
+
+    labels, proba = tree.predict(test_X.to_numpy())
+    assert (labels == clf.predict(test_X)).all(), 'labels differ from sklearn'
+    assert np.allclose(proba, clf.predict_proba(test_X)), 'probabilities differ from sklearn'
+
+    rows = test_X.to_numpy()[:1000]
+    start = time.perf_counter()
+    for row in rows:
+        tree.predict_one(row)
+    per_row = (time.perf_counter() - start) / len(rows) * 1e6
+
+    print(f'OK: {len(test_X)} held-out rows match sklearn '
+          f'({tree.node_count} nodes, depth {tree.max_depth}, {per_row:.1f} µs/row)')
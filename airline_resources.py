@@ -0,0 +1,130 @@
+# ===========================================
+# ♻️ SHARED APP RESOURCES
+# ===========================================
+# Streamlit reruns the whole script on every widget change. The model and
+# the comparison statistics are loaded once per process here and shared
+# (read-only) by every session. Each cache is keyed on the file's mtime and
+# size, so replacing dt_airline.pickle, the model bundle, airline.csv or
+# airline_meta.json on disk triggers a reload. The bundle's arrays are
+# memory-mapped, so several worker processes share one copy of the model.
+#
+# Only light modules are imported up front: pandas, numpy and the model code
+# are imported on first use, so the sidebar renders before any of them load.
+
+import os
+
+import streamlit as st
+
+from airline_schema import (
+    BUNDLE_PATH, CSV_PATH, DRIFT_BASELINE_PATH, MANIFEST_NAME, META_PATH, MODEL_PATH, file_version,
+)
+from airline_stats import load_stats
+
+
+@st.cache_resource(show_spinner="Loading model...", max_entries=1)
+def _load_model_resources(path, version):
+    from airline_data import load_model
+    from airline_model import CompiledTree, SurveyEncoder
+
+    clf = load_model(path)
+    return clf, SurveyEncoder.from_model(clf), CompiledTree.from_sklearn(clf)
+
+
+@st.cache_resource(show_spinner="Loading model...", max_entries=1)
+def _load_bundle(path, version):
+    from airline_model import load_bundle
+
+    return load_bundle(path)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_stats(csv_path, csv_version, meta_path, meta_version):
+    return load_stats(csv_path, meta_path)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_prediction_cache(path, version, _encoder, _tree):
+    # Keyed on the model file version, so replacing the model starts a new
+    # cache; the explainer's node tables are built here, once per model
+    from airline_model import PredictionCache, TreeExplainer
+
+    return PredictionCache(_tree, version=f'{path}@{version[0]}',
+                           explainer=TreeExplainer(_tree, _encoder))
+
+
+@st.cache_resource(show_spinner=False)
+def _load_job_queue():
+    from airline_jobs import JobQueue
+
+    return JobQueue()
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_drift_monitor(path, version):
+    # A new baseline file starts a fresh monitor
+    from airline_drift import load_monitor
+
+    return load_monitor(path)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _bundle_is_current(manifest_version, model_version):
+    # Hashes the pickle only when either file changes
+    from airline_model import bundle_is_current
+
+    return bundle_is_current(BUNDLE_PATH, MODEL_PATH)
+
+
+def _model_source():
+    # Prefer the memory-mapped bundle while it is an export of the current
+    # pickle; a replaced dt_airline.pickle is compiled instead
+    manifest = os.path.join(BUNDLE_PATH, MANIFEST_NAME)
+    if os.path.isfile(manifest):
+        model_version = file_version(MODEL_PATH) if os.path.exists(MODEL_PATH) else None
+        if _bundle_is_current(file_version(manifest), model_version):
+            return BUNDLE_PATH, file_version(manifest)
+    return MODEL_PATH, file_version(MODEL_PATH)
+
+
+def _predictor(source=None):
+    path, version = source or _model_source()
+    if path == BUNDLE_PATH:
+        bundle = _load_bundle(path, version)
+        return bundle.encoder, bundle.tree
+    _, encoder, tree = _load_model_resources(path, version)
+    return encoder, tree
+
+
+def get_encoder():
+    """SurveyEncoder matching the deployed model."""
+    return _predictor()[0]
+
+
+def get_tree():
+    """CompiledTree of the deployed model (class + probabilities in one walk)."""
+    return _predictor()[1]
+
+
+def get_prediction_cache():
+    """Process-wide LRU of predictions (and explanations) for the deployed model."""
+    source = _model_source()
+    return _load_prediction_cache(*source, *_predictor(source))
+
+
+def get_job_queue():
+    """Background scoring jobs; one worker pool shared fairly by every session."""
+    return _load_job_queue()
+
+
+def get_drift_monitor(path=DRIFT_BASELINE_PATH):
+    """Process-wide DriftMonitor fed by every session, or None without a baseline."""
+    if not os.path.exists(path):
+        return None
+    return _load_drift_monitor(path, file_version(path))
+
+
+def get_stats(csv_path=CSV_PATH, meta_path=META_PATH):
+    """Sidebar metadata and comparison statistics (from airline_meta.json)."""
+    csv_version = file_version(csv_path) if os.path.exists(csv_path) else None
+    meta_version = file_version(meta_path) if os.path.exists(meta_path) else None
+    return _load_stats(csv_path, csv_version, meta_path, meta_version)
@@ -0,0 +1,54 @@
+# ===========================================
+# 🗂️ AIRLINE DATASET SCHEMA
+# ===========================================
+# File locations and column groups. Kept free of heavy imports (no pandas
+# or numpy) so the apps can build the sidebar before any of those load.
+
+import hashlib
+import os
+
+CSV_PATH = 'airline.csv'
+MODEL_PATH = 'dt_airline.pickle'
+# Memory-mappable export of the same model (see airline_model.save_bundle)
+BUNDLE_PATH = 'dt_airline_bundle'
+MANIFEST_NAME = 'manifest.json'
+# Columnar cache of the cleaned dataset (see airline_data.load_airline_df)
+CACHE_PATH = 'airline_cache'
+# Sidebar metadata and comparison stats derived from airline.csv (see airline_stats)
+META_PATH = 'airline_meta.json'
+# Training-split distributions the drift monitor compares traffic with (see airline_drift)
+DRIFT_BASELINE_PATH = 'drift_baseline.json'
+
+TARGET_COL = 'satisfaction'
+
+# Columns one-hot encoded in the notebook (cat_var in airline_ml.ipynb)
+CATEGORICAL_COLS = ['customer_type', 'type_of_travel', 'class']
+
+NUMERIC_COLS = ['age', 'flight_distance', 'departure_delay_in_minutes', 'arrival_delay_in_minutes']
+
+# 1–5 star survey answers
+RATING_COLS = [
+    'seat_comfort', 'food_and_drink', 'gate_location', 'inflight_wifi_service',
+    'inflight_entertainment', 'online_support', 'ease_of_online_booking',
+    'on-board_service', 'leg_room_service', 'baggage_handling',
+    'checkin_service', 'cleanliness', 'online_boarding',
+    'departure_arrival_time_convenient',
+]
+
+# Model inputs, in the order selected in airline_ml.ipynb
+FEATURE_COLS = CATEGORICAL_COLS + NUMERIC_COLS + RATING_COLS
+
+
+def file_version(path):
+    """Cheap change marker for a file on disk: (mtime_ns, size)."""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents (survives copies and checkouts, unlike mtimes)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
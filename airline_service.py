@@ -0,0 +1,267 @@
+# ===========================================
+# 🛰️ HEADLESS PREDICTION SERVICE
+# ===========================================
+# Minimal asyncio JSON endpoint for machine-to-machine scoring. Loads the
+# same model as the apps (the bundle, or dt_airline.pickle) once at startup.
+# Concurrent requests are gathered into micro-batches (up to --max-batch
+# surveys or --max-wait-ms, whichever comes first) and scored with one
+# vectorized predict per batch.
+#
+#   python airline_service.py --port 8000
+#
+#   POST /predict   one survey object, or a list of them (airline.csv columns)
+#   GET  /metrics   latency percentiles and batch-size histogram
+#   GET  /drift     scored traffic vs the training split (needs drift_baseline.json)
+#   GET  /health
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+from airline_drift import load_monitor
+from airline_model import default_model_path, load_predictor
+from airline_schema import DRIFT_BASELINE_PATH
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+
+# Number of recent request latencies kept for the percentiles
+LATENCY_WINDOW = 10_000
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+# -------------------------------------------
+# 📈 Metrics
+# -------------------------------------------
+class ServiceMetrics:
+    """Request latencies (recent window) and the batch-size histogram."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.latencies_ms = deque(maxlen=window)
+        self.batch_sizes = Counter()
+        self.requests = 0
+        self.surveys = 0
+        self.errors = 0
+
+    def record_request(self, seconds, n_surveys):
+        self.latencies_ms.append(seconds * 1000)
+        self.requests += 1
+        self.surveys += n_surveys
+
+    def record_batch(self, size):
+        self.batch_sizes[size] += 1
+
+    def snapshot(self):
+        latencies = np.fromiter(self.latencies_ms, dtype=np.float64)
+        if len(latencies):
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            percentiles = {'p50': p50, 'p90': p90, 'p99': p99, 'max': latencies.max()}
+        else:
+            percentiles = {}
+        n_batches = sum(self.batch_sizes.values())
+        return {
+            'requests': self.requests,
+            'surveys': self.surveys,
+            'errors': self.errors,
+            'latency_ms': {k: round(float(v), 3) for k, v in percentiles.items()},
+            'batches': n_batches,
+            'mean_batch_size': round(sum(k * v for k, v in self.batch_sizes.items()) / n_batches, 2)
+            if n_batches else 0.0,
+            'batch_size_histogram': {str(k): v for k, v in sorted(self.batch_sizes.items())},
+        }
+
+
+# -------------------------------------------
+# 📦 Micro-batching
+# -------------------------------------------
+class MicroBatcher:
+    """Collect encoded surveys from concurrent requests and score them together."""
+
+    def __init__(self, tree, metrics, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.tree = tree
+        self.metrics = metrics
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = asyncio.Queue()
+
+    async def predict(self, row):
+        """(label, probabilities) for one encoded row, via the next batch."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            rows, futures = zip(*batch)
+            try:
+                labels, proba = self.tree.predict(np.vstack(rows))
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.metrics.record_batch(len(batch))
+            for future, label, p in zip(futures, labels, proba):
+                if not future.done():
+                    future.set_result((label, p))
+
+
+# -------------------------------------------
+# 🌐 HTTP Handling
+# -------------------------------------------
+class PredictionService:
+    """Tiny HTTP/1.1 server (keep-alive aware) around a MicroBatcher."""
+
+    def __init__(self, encoder, tree, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 monitor=None):
+        self.encoder = encoder
+        self.tree = tree
+        self.monitor = monitor
+        self.metrics = ServiceMetrics()
+        self.batcher = MicroBatcher(self.tree, self.metrics, max_batch, max_wait_ms)
+
+    async def predict(self, payload):
+        surveys = payload if isinstance(payload, list) else [payload]
+        rows = [self.encoder.encode(survey) for survey in surveys]
+        results = await asyncio.gather(*(self.batcher.predict(row) for row in rows))
+        if self.monitor is not None:
+            for survey, (label, _) in zip(surveys, results):
+                self.monitor.update(survey, label)
+        predictions = [
+            {
+                'satisfaction': str(label),
+                'confidence': float(p.max()),
+                'probabilities': {str(c): float(v) for c, v in zip(self.tree.classes, p)},
+            }
+            for label, p in results
+        ]
+        return predictions if isinstance(payload, list) else predictions[0]
+
+    async def route(self, method, path, body):
+        if path == '/predict':
+            if method != 'POST':
+                return 405, {'error': 'use POST'}
+            try:
+                payload = json.loads(body)
+                start = time.perf_counter()
+                result = await self.predict(payload)
+            except KeyError as e:
+                return 400, {'error': f'missing field: {e.args[0]}'}
+            except (TypeError, ValueError) as e:
+                return 400, {'error': str(e)}
+            self.metrics.record_request(time.perf_counter() - start,
+                                        len(payload) if isinstance(payload, list) else 1)
+            return 200, result
+        if path == '/metrics':
+            return 200, self.metrics.snapshot()
+        if path == '/drift':
+            if self.monitor is None:
+                return 404, {'error': 'no drift baseline loaded'}
+            return 200, self.monitor.check()
+        if path == '/health':
+            return 200, {'status': 'ok', 'classes': [str(c) for c in self.tree.classes]}
+        return 404, {'error': f'no route for {path}'}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, version = request_line.decode('latin-1').split(maxsplit=2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    status, result = 413, {'error': 'request body too large'}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    try:
+                        status, result = await self.route(method, path.split('?', 1)[0], body)
+                    except Exception as e:
+                        status, result = 500, {'error': str(e)}
+                    keep_alive = (headers.get('connection', '').lower() != 'close'
+                                  and not version.strip().endswith('1.0'))
+
+                if status >= 400:
+                    self.metrics.errors += 1
+                data = json.dumps(result).encode()
+                writer.write(
+                    f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+                    f'Content-Type: application/json\r\n'
+                    f'Content-Length: {len(data)}\r\n'
+                    f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        batch_task = asyncio.create_task(self.batcher.run())
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f'Serving predictions on http://{host}:{port} '
+              f'(max batch {self.batcher.max_batch}, max wait {self.batcher.max_wait * 1000:g} ms)')
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batch_task.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve airline satisfaction predictions over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--model', default=default_model_path(),
+                        help='model bundle directory or pickled DecisionTreeClassifier')
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH,
+                        help='largest number of surveys scored together')
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help='how long the first survey in a batch waits for company')
+    parser.add_argument('--drift-baseline', default=DRIFT_BASELINE_PATH,
+                        help='drift baseline to compare traffic with (skipped if missing)')
+    args = parser.parse_args(argv)
+
+    encoder, tree = load_predictor(args.model)
+    service = PredictionService(encoder, tree, args.max_batch, args.max_wait_ms,
+                                load_monitor(args.drift_baseline))
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
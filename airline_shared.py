@@ -0,0 +1,102 @@
+# ===========================================
+# 🤝 MULTI-WORKER DEPLOYMENT
+# ===========================================
+# Run several app (or scoring) processes on one host without each holding
+# its own copy of the model and the dataset. The parent builds every derived
+# file once (columnar dataset cache, model bundle, airline_meta.json); the
+# workers then open the .npy files memory-mapped and read-only, so all of
+# them share the same physical pages through the OS page cache and nothing
+# is unpickled or parsed per worker. App workers map the model bundle (see
+# airline_resources) and read their statistics from airline_meta.json, so
+# they never load the dataset; scoring processes can attach() to both. The
+# drift baseline is built here too, if missing, so every worker's monitor
+# compares against the same file.
+#
+#   python airline_shared.py prepare                         # build the shared files
+#   python airline_shared.py launch airline1_dt.py -n 4      # ports 8501-8504
+#
+# Put any load balancer in front of the launched ports. To check that memory
+# per launched worker stays flat as the worker count grows:
+#   python airline_bench.py workers
+
+import argparse
+import os
+import subprocess
+import sys
+
+from airline_schema import (
+    BUNDLE_PATH, CACHE_PATH, CSV_PATH, DRIFT_BASELINE_PATH, META_PATH, MODEL_PATH,
+)
+
+
+def prepare(csv_path=CSV_PATH, cache_path=CACHE_PATH, bundle_path=BUNDLE_PATH,
+            model_path=MODEL_PATH, meta_path=META_PATH, drift_path=DRIFT_BASELINE_PATH):
+    """Build every file the workers map, once, in this process."""
+    from airline_data import load_airline_df, load_model
+    from airline_model import bundle_is_current, save_bundle
+    from airline_stats import load_stats
+
+    if os.path.exists(csv_path):
+        load_airline_df(csv_path, cache_path)
+    if os.path.exists(csv_path) or os.path.exists(meta_path):
+        load_stats(csv_path, meta_path)
+
+    # Re-export when the bundle is missing or no longer matches the pickle
+    if os.path.exists(model_path) and not bundle_is_current(bundle_path, model_path):
+        save_bundle(load_model(model_path), bundle_path, model_path=model_path)
+
+    if os.path.exists(csv_path) and not os.path.exists(drift_path):
+        from airline_drift import write_baseline
+
+        write_baseline(csv_path, bundle_path, drift_path, cache_path)
+
+
+def attach(cache_path=CACHE_PATH, bundle_path=BUNDLE_PATH):
+    """(dataset, encoder, tree) memory-mapped from files built by prepare()."""
+    from airline_data import read_cache
+    from airline_model import load_bundle
+
+    bundle = load_bundle(bundle_path, mmap_mode='r')
+    return read_cache(cache_path, mmap_mode='r'), bundle.encoder, bundle.tree
+
+
+def worker_command(app, port, extra_args=()):
+    """Command line of one Streamlit worker serving ``app`` on ``port``."""
+    return [sys.executable, '-m', 'streamlit', 'run', app,
+            '--server.port', str(port), '--server.headless', 'true', *extra_args]
+
+
+def launch(app, workers, base_port=8501, extra_args=()):
+    """Start ``workers`` Streamlit servers for ``app`` sharing the prepared files."""
+    processes = [subprocess.Popen(worker_command(app, base_port + i, extra_args))
+                 for i in range(workers)]
+    print(f'Started {workers} workers for {app} on ports {base_port}-{base_port + workers - 1}')
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Multi-worker deployment sharing one model and dataset.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('prepare', help='build the dataset cache, model bundle and metadata file')
+    run = sub.add_parser('launch', help='prepare, then start several Streamlit workers')
+    run.add_argument('app', help='app script, e.g. airline1_dt.py')
+    run.add_argument('-n', '--workers', type=int, default=2)
+    run.add_argument('--base-port', type=int, default=8501)
+    args, extra = parser.parse_known_args(argv)
+
+    prepare()
+    if args.command == 'launch':
+        launch(args.app, args.workers, args.base_port, extra)
+    else:
+        print(f'Shared files ready: {CACHE_PATH}/, {BUNDLE_PATH}/, {META_PATH}, {DRIFT_BASELINE_PATH}')
+
+
+if __name__ == '__main__':
+    main()
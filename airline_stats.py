@@ -0,0 +1,261 @@
+# ===========================================
+# 📊 PRECOMPUTED DATASET STATISTICS
+# ===========================================
+# Everything the sidebar and the comparison expanders need from the dataset,
+# computed once when the data loads. Lookups are dictionary reads, so reruns
+# never scan (or write into) the shared frame. The counts are additive, so
+# the index is built by streaming the CSV in chunks and never needs the
+# whole file in memory.
+#
+# The index is also saved to a tiny JSON file (airline_meta.json) so the apps
+# can render the sidebar without importing pandas or reading airline.csv.
+#
+# New survey batches are folded into the stored counts in O(batch) time
+# without rescanning airline.csv; the apps reload the file when it changes.
+# They only add to the counts: the sidebar keeps offering the levels of the
+# CSV the index was built from (the ones the model was trained on).
+#
+#   python airline_stats.py                      # rebuild airline_meta.json from airline.csv
+#   python airline_stats.py --append new.csv     # add a batch of new surveys
+
+import json
+import os
+import warnings
+from bisect import bisect_right
+from datetime import datetime, timezone
+
+from airline_schema import (
+    CATEGORICAL_COLS, CSV_PATH, META_PATH, NUMERIC_COLS, RATING_COLS, file_digest, file_version,
+)
+
+# Age buckets used by the "Age Group Comparison" expander (right-open)
+AGE_BINS = [0, 18, 30, 45, 60, 75, 100]
+AGE_LABELS = ['Under 18', '18–30', '31–45', '46–60', '61–75', '76+']
+
+
+def age_group(age):
+    """Bucket label for one age, or None when outside AGE_BINS."""
+    pos = bisect_right(AGE_BINS, age) - 1
+    if 0 <= pos < len(AGE_LABELS):
+        return AGE_LABELS[pos]
+    return None
+
+
+class StatsIndex:
+    """Category frequencies, numeric bounds and the age histogram."""
+
+    def __init__(self, n_rows, category_counts, numeric_bounds, age_counts, rating_counts=None,
+                 known_levels=None):
+        self.n_rows = n_rows
+        # {column: {level: count}}, levels in order of first appearance
+        self.category_counts = category_counts
+        # {column: [level]} offered in the sidebar: the levels of the baseline
+        # CSV, not new text from appended batches the model has never seen
+        self.known_levels = known_levels if known_levels is not None else self._seen_levels()
+        # {column: (min, max)}
+        self.numeric_bounds = numeric_bounds
+        # {age label: count}
+        self.age_counts = age_counts
+        # {rating column: {'0'..'5': count}} (string keys, as stored in JSON)
+        self.rating_counts = rating_counts if rating_counts is not None else {}
+
+    @classmethod
+    def empty(cls):
+        return cls(0, {col: {} for col in CATEGORICAL_COLS}, {}, {label: 0 for label in AGE_LABELS},
+                   {col: {} for col in RATING_COLS})
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls.from_chunks([df])
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Build from an iterable of cleaned DataFrame chunks."""
+        stats = cls.empty()
+        for chunk in chunks:
+            stats.update(chunk)
+        stats.known_levels = stats._seen_levels()
+        return stats
+
+    @classmethod
+    def from_csv(cls, path=CSV_PATH, chunksize=None):
+        """Stream a survey CSV chunk by chunk (memory bounded by ``chunksize``)."""
+        from airline_data import DEFAULT_CHUNKSIZE, read_airline_chunks
+
+        chunks = read_airline_chunks(path, chunksize or DEFAULT_CHUNKSIZE)
+        return cls.from_chunks(chunk for _, chunk in chunks)
+
+    def update(self, df):
+        """Add a cleaned chunk of surveys to the counts and bounds; returns self.
+
+        Costs O(len(df)) whatever the size of the index, so new surveys can
+        be folded in as they arrive.
+        """
+        import pandas as pd
+
+        for col in CATEGORICAL_COLS:
+            counts = self.category_counts.setdefault(col, {})
+            chunk_counts = df[col].value_counts()
+            for level in df[col].unique():
+                counts[level] = counts.get(level, 0) + int(chunk_counts[level])
+
+        for col in NUMERIC_COLS:
+            if not len(df):
+                break
+            low, high = int(df[col].min()), int(df[col].max())
+            if col in self.numeric_bounds:
+                old_low, old_high = self.numeric_bounds[col]
+                low, high = min(low, old_low), max(high, old_high)
+            self.numeric_bounds[col] = (low, high)
+
+        age_groups = pd.cut(df['age'], bins=AGE_BINS, labels=AGE_LABELS, right=False)
+        counts = age_groups.value_counts()
+        for label in AGE_LABELS:
+            self.age_counts[label] = self.age_counts.get(label, 0) + int(counts[label])
+
+        for col in RATING_COLS:
+            counts = self.rating_counts.setdefault(col, {})
+            for star, count in df[col].value_counts().items():
+                key = str(int(star))
+                counts[key] = counts.get(key, 0) + int(count)
+
+        self.n_rows += len(df)
+        return self
+
+    def _seen_levels(self):
+        return {col: list(counts) for col, counts in self.category_counts.items()}
+
+    def levels(self, col):
+        """Selectbox options for a categorical column (baseline levels only)."""
+        return list(self.known_levels[col])
+
+    def bounds(self, col):
+        """(min, max) of a numeric column as ints."""
+        return self.numeric_bounds[col]
+
+    def _pct(self, count):
+        return count / self.n_rows * 100 if self.n_rows else 0.0
+
+    def category_pct(self, col, level):
+        """Percentage of flyers whose ``col`` equals ``level``."""
+        return self._pct(self.category_counts[col].get(level, 0))
+
+    def age_group_pct(self, label):
+        """Percentage of flyers in an age bucket."""
+        return self._pct(self.age_counts.get(label, 0))
+
+    def rating_pct(self, col, star):
+        """Percentage of flyers who gave ``star`` stars for a rating column."""
+        return self._pct(self.rating_counts.get(col, {}).get(str(int(star)), 0))
+
+    def to_dict(self):
+        return {
+            'n_rows': self.n_rows,
+            'category_counts': self.category_counts,
+            'known_levels': self.known_levels,
+            'numeric_bounds': {col: list(bounds) for col, bounds in self.numeric_bounds.items()},
+            'age_counts': self.age_counts,
+            'rating_counts': {col: dict(sorted(counts.items())) for col, counts in self.rating_counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        numeric_bounds = {col: tuple(bounds) for col, bounds in data['numeric_bounds'].items()}
+        return cls(data['n_rows'], data['category_counts'], numeric_bounds, data['age_counts'],
+                   data.get('rating_counts'), data.get('known_levels'))
+
+
+# -------------------------------------------
+# 💾 Metadata File
+# -------------------------------------------
+def write_meta(stats, path=META_PATH, source=None, appended=0, digest=None):
+    """Save ``stats``; ``source`` is the file_version() of the CSV it came from.
+
+    ``digest`` is that CSV's file_digest() and ``appended`` counts the survey
+    batches added on top of it.
+    """
+    data = {'source': list(source) if source else None, 'sha256': digest, 'appended': appended,
+            'updated': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'stats': stats.to_dict()}
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _read_meta_data(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    source = tuple(data['source']) if data.get('source') else None
+    return StatsIndex.from_dict(data['stats']), source, data.get('appended', 0), data.get('sha256')
+
+
+def read_meta(path=META_PATH):
+    """(StatsIndex, source version) from a metadata file."""
+    return _read_meta_data(path)[:2]
+
+
+def load_stats(csv_path=CSV_PATH, meta_path=META_PATH):
+    """StatsIndex from the metadata file, rebuilt first if airline.csv changed.
+
+    Without the CSV (e.g. a slim deployment) the metadata file is used as-is.
+    The CSV's mtime and size are only a cheap pre-check: a touched or copied
+    file with the same contents keeps the stored counts. Counts that include
+    batches added with append_surveys() are never dropped here; rebuild them
+    explicitly with ``python airline_stats.py``.
+    """
+    source = file_version(csv_path) if os.path.exists(csv_path) else None
+    if os.path.exists(meta_path):
+        stats, meta_source, appended, digest = _read_meta_data(meta_path)
+        if source is None or meta_source == source:
+            return stats
+        if digest is not None and digest == file_digest(csv_path):
+            write_meta(stats, meta_path, source, appended, digest)
+            return stats
+        if appended:
+            warnings.warn(f'{csv_path} changed since {meta_path} was built; keeping its {appended} '
+                          f'appended batch(es). Run `python airline_stats.py` to rebuild from {csv_path}.')
+            return stats
+
+    stats = StatsIndex.from_csv(csv_path)
+    write_meta(stats, meta_path, source, digest=file_digest(csv_path))
+    return stats
+
+
+def append_surveys(source, meta_path=META_PATH, csv_path=CSV_PATH, chunksize=None):
+    """Fold new surveys (a CSV path/file or a raw DataFrame) into the metadata file.
+
+    Only the new rows are read; the stored counts are updated in place and
+    the file is rewritten atomically, so running apps pick up the new
+    percentages on their next rerun. Returns the updated StatsIndex.
+    """
+    from airline_data import DEFAULT_CHUNKSIZE, clean_airline_df, read_airline_chunks
+
+    load_stats(csv_path, meta_path)  # make sure the baseline exists and is current
+    stats, meta_source, appended, digest = _read_meta_data(meta_path)
+
+    if hasattr(source, 'columns'):
+        stats.update(clean_airline_df(source))
+    else:
+        for _, chunk in read_airline_chunks(source, chunksize or DEFAULT_CHUNKSIZE):
+            stats.update(chunk)
+    write_meta(stats, meta_path, meta_source, appended + 1, digest)
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build or update the comparison statistics file.')
+    parser.add_argument('--append', nargs='+', metavar='CSV',
+                        help='add these survey files to the existing statistics instead of rebuilding')
+    args = parser.parse_args()
+
+    if args.append:
+        for path in args.append:
+            stats = append_surveys(path)
+            print(f'Added {path}: {META_PATH} now covers {stats.n_rows:,} surveys')
+    else:
+        stats = StatsIndex.from_csv(CSV_PATH)
+        write_meta(stats, META_PATH, file_version(CSV_PATH), digest=file_digest(CSV_PATH))
+        print(f'Wrote {META_PATH} from {stats.n_rows:,} rows of {CSV_PATH}')
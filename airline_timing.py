@@ -0,0 +1,234 @@
+# ===========================================
+# ⏱️ RERUN TIMING INSTRUMENTATION
+# ===========================================
+# Wall-clock timings for each stage of an app rerun (data load, widgets,
+# encoding, inference, each comparison expander). Every rerun's timings are
+# kept per session and folded into one process-wide aggregate shared by all
+# sessions.
+#
+# Off by default. Enable with AIRLINE_TIMING=1 (every session) or by opening
+# the app with ?debug=1 (that session only). When disabled, stage() returns a
+# shared no-op context manager and checkpoint() does nothing, so the
+# instrumentation costs one method call per stage. Set AIRLINE_TIMING_LOG=path to also append one JSON line
+# per rerun to a log file.
+#
+# Only the standard library is imported, so this is safe to load before the
+# sidebar renders.
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+ENABLE_ENV = 'AIRLINE_TIMING'
+LOG_ENV = 'AIRLINE_TIMING_LOG'
+
+# Recent samples kept per stage for the percentiles
+TIMING_WINDOW = 1_000
+
+
+def timing_enabled():
+    """True when AIRLINE_TIMING is set to a truthy value."""
+    return os.environ.get(ENABLE_ENV, '').lower() in ('1', 'true', 'yes', 'on')
+
+
+# -------------------------------------------
+# 🕒 Per-rerun Timers
+# -------------------------------------------
+class _Stage:
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.timer._add(self.name, end - self.start)
+        self.timer._last = end
+        return False
+
+
+class RerunTimer:
+    """Stage timings (ms) for one script run."""
+
+    enabled = True
+
+    def __init__(self):
+        self.stages = {}
+        self.started = time.time()
+        self._start = self._last = time.perf_counter()
+
+    def _add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds * 1000
+
+    def stage(self, name):
+        """Context manager adding the time spent inside it to ``name``."""
+        return _Stage(self, name)
+
+    def checkpoint(self, name):
+        """Charge the time since the previous stage or checkpoint ended to ``name``."""
+        now = time.perf_counter()
+        self._add(name, now - self._last)
+        self._last = now
+
+    def finish(self):
+        """This rerun's timings, including the 'total' wall time."""
+        return {**self.stages, 'total': (time.perf_counter() - self._start) * 1000}
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullTimer:
+    """Stand-in used when timing is disabled; records nothing."""
+
+    enabled = False
+    stages = {}
+    _stage = _NullStage()
+
+    def stage(self, name):
+        return self._stage
+
+    def checkpoint(self, name):
+        pass
+
+    def finish(self):
+        return None
+
+
+NULL_TIMER = NullTimer()
+
+
+def start_rerun(enabled):
+    """A RerunTimer when ``enabled``, else the shared no-op timer."""
+    return RerunTimer() if enabled else NULL_TIMER
+
+
+# -------------------------------------------
+# 📈 Aggregation
+# -------------------------------------------
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class TimingStats:
+    """Thread-safe running totals and recent percentiles per stage."""
+
+    def __init__(self, window=TIMING_WINDOW):
+        self.window = window
+        self.reruns = 0
+        self._count = {}
+        self._total = {}
+        self._max = {}
+        self._recent = {}
+        self._lock = threading.Lock()
+
+    def record(self, timings):
+        with self._lock:
+            self.reruns += 1
+            for name, ms in timings.items():
+                self._count[name] = self._count.get(name, 0) + 1
+                self._total[name] = self._total.get(name, 0.0) + ms
+                self._max[name] = max(self._max.get(name, 0.0), ms)
+                if name not in self._recent:
+                    self._recent[name] = deque(maxlen=self.window)
+                self._recent[name].append(ms)
+
+    def snapshot(self):
+        """{stage: {count, mean_ms, p50_ms, p90_ms, p99_ms, max_ms}}, slowest mean first."""
+        with self._lock:
+            stages = {}
+            for name, count in self._count.items():
+                recent = sorted(self._recent[name])
+                stages[name] = {
+                    'count': count,
+                    'mean_ms': round(self._total[name] / count, 3),
+                    'p50_ms': round(_percentile(recent, 0.50), 3),
+                    'p90_ms': round(_percentile(recent, 0.90), 3),
+                    'p99_ms': round(_percentile(recent, 0.99), 3),
+                    'max_ms': round(self._max[name], 3),
+                }
+            reruns = self.reruns
+        stages = dict(sorted(stages.items(), key=lambda item: -item[1]['mean_ms']))
+        return {'reruns': reruns, 'stages': stages}
+
+
+def format_table(stages):
+    """Markdown table of a snapshot's (or one rerun's) stage timings."""
+    if not stages:
+        return '_No timings yet._'
+    first = next(iter(stages.values()))
+    if not isinstance(first, dict):
+        stages = {name: {'ms': round(ms, 3)} for name, ms in stages.items()}
+        first = next(iter(stages.values()))
+    columns = list(first)
+    lines = ['| stage | ' + ' | '.join(columns) + ' |', '|---' * (len(columns) + 1) + '|']
+    for name, row in stages.items():
+        lines.append(f'| {name} | ' + ' | '.join(str(row[col]) for col in columns) + ' |')
+    return '\n'.join(lines)
+
+
+# Shared by every session in this server process
+PROCESS_STATS = TimingStats()
+
+_log_lock = threading.Lock()
+
+
+def record_rerun(timer, session_stats=None, app=None):
+    """Fold a finished rerun into the session and process aggregates.
+
+    Returns the rerun's timings, or None when ``timer`` is disabled.
+    """
+    timings = timer.finish()
+    if timings is None:
+        return None
+    if session_stats is not None:
+        session_stats.record(timings)
+    PROCESS_STATS.record(timings)
+
+    log_path = os.environ.get(LOG_ENV)
+    if log_path:
+        line = json.dumps({'time': timer.started, 'app': app, 'pid': os.getpid(),
+                           'timings_ms': {k: round(v, 3) for k, v in timings.items()}})
+        with _log_lock, open(log_path, 'a') as f:
+            f.write(line + '\n')
+    return timings
+
+
+def summarize_log(path):
+    """Aggregate an AIRLINE_TIMING_LOG file into one snapshot."""
+    stats = TimingStats(window=10 ** 9)
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                stats.record(json.loads(line)['timings_ms'])
+    return stats.snapshot()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Summarize an AIRLINE_TIMING_LOG file.')
+    parser.add_argument('log', help='JSON-lines timing log written by the apps')
+    parser.add_argument('--json', action='store_true', help='print the snapshot as JSON')
+    args = parser.parse_args()
+
+    snapshot = summarize_log(args.log)
+    if args.json:
+        print(json.dumps(snapshot, indent=2))
+    else:
+        print(f"{snapshot['reruns']:,} reruns")
+        print(format_table(snapshot['stages']))
@@ -0,0 +1,358 @@
+# ===========================================
+# 🏋️ AIRLINE MODEL TRAINING
+# ===========================================
+# Headless version of airline_ml.ipynb: same features, same one-hot
+# encoding, same train_test_split(test_size=0.2, random_state=1). Adds a
+# hyperparameter search (max_depth, min_samples_leaf, ccp_alpha) scored by
+# cross-validation on the training split, run across all cores with a
+# process pool. The best model is refit on the full training split and
+# saved with the same artifacts the notebook produces.
+#
+#   python airline_train.py                 # search, then write artifacts to .
+#   python airline_train.py --no-search     # notebook model: unbounded tree
+#   python airline_train.py --jobs 8 --cv 5 --out-dir build/
+#   python airline_train.py --variants      # size/latency report for pruned trees
+#   python airline_train.py --variants --deploy
+
+import argparse
+import itertools
+import os
+import pickle
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, f1_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.tree import DecisionTreeClassifier
+
+from airline_data import load_model
+from airline_model import CompiledTree, load_bundle, save_bundle
+from airline_schema import (
+    BUNDLE_PATH, CATEGORICAL_COLS, CSV_PATH, FEATURE_COLS, MODEL_PATH, TARGET_COL,
+)
+
+RANDOM_STATE = 0
+SPLIT_RANDOM_STATE = 1
+TEST_SIZE = 0.2
+
+# Search space; None means "no limit" / "no pruning", as in the notebook model
+PARAM_GRID = {
+    'max_depth': [None, 10, 15, 20, 25],
+    'min_samples_leaf': [1, 5, 10, 20],
+    'ccp_alpha': [0.0, 1e-5, 5e-5, 1e-4],
+}
+
+# Smaller/faster alternatives to the unbounded notebook tree
+VARIANTS = {
+    'full': {},
+    'depth_8': {'max_depth': 8},
+    'depth_12': {'max_depth': 12},
+    'depth_16': {'max_depth': 16},
+    'depth_20': {'max_depth': 20},
+    'ccp_1e-5': {'ccp_alpha': 1e-5},
+    'ccp_3e-5': {'ccp_alpha': 3e-5},
+    'ccp_1e-4': {'ccp_alpha': 1e-4},
+    'ccp_3e-4': {'ccp_alpha': 3e-4},
+    'depth_16_ccp_3e-5': {'max_depth': 16, 'ccp_alpha': 3e-5},
+}
+
+# How much held-out accuracy a variant may give up versus the full tree
+DEFAULT_TOLERANCE = 0.005
+
+REPORT_PATH = 'class_report.csv'
+CONFUSION_PATH = 'confusion_mat.svg'
+IMPORTANCE_PATH = 'feature_imp.svg'
+SEARCH_PATH = 'search_results.csv'
+VARIANTS_PATH = 'variants_report.csv'
+VARIANTS_DIR = 'variants'
+
+
+# -------------------------------------------
+# 📂 Data
+# -------------------------------------------
+def load_training_data(path=CSV_PATH):
+    """One-hot encoded features and target, split exactly like the notebook.
+
+    Returns (train_X, test_X, train_y, test_y).
+    """
+    # Raw category text, as in the notebook: the dummy names (and so the
+    # feature order) of dt_airline.pickle come from it, not from the
+    # normalized text load_airline_df() serves to the apps
+    airline_df = pd.read_csv(path).dropna()
+    features_encoded = pd.get_dummies(airline_df[FEATURE_COLS], columns=CATEGORICAL_COLS)
+    output = airline_df[TARGET_COL].astype(str)
+    return train_test_split(features_encoded, output,
+                            test_size=TEST_SIZE, random_state=SPLIT_RANDOM_STATE)
+
+
+def param_combinations(grid=PARAM_GRID):
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+
+
+# -------------------------------------------
+# 🔍 Parallel Search
+# -------------------------------------------
+# Training data is sent to each worker once (initializer), not with every task
+_worker_X = None
+_worker_y = None
+
+
+def _init_worker(X, y):
+    global _worker_X, _worker_y
+    _worker_X, _worker_y = X, y
+
+
+def _fit_fold(params, train_idx, val_idx):
+    clf = DecisionTreeClassifier(random_state=RANDOM_STATE, **params)
+    clf.fit(_worker_X[train_idx], _worker_y[train_idx])
+    accuracy = accuracy_score(_worker_y[val_idx], clf.predict(_worker_X[val_idx]))
+    return accuracy, clf.tree_.node_count
+
+
+def search(train_X, train_y, grid=PARAM_GRID, cv=3, jobs=None):
+    """Cross-validated accuracy and tree size for every combination in ``grid``.
+
+    Every (combination, fold) pair is an independent task for the process
+    pool. Returns a DataFrame sorted best first (highest mean accuracy, then
+    smallest tree).
+    """
+    X = train_X.to_numpy(dtype=np.float32)
+    y = train_y.to_numpy()
+    folds = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=RANDOM_STATE).split(X, y))
+    combos = param_combinations(grid)
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(X, y)) as pool:
+        futures = {
+            (i, k): pool.submit(_fit_fold, params, train_idx, val_idx)
+            for i, params in enumerate(combos)
+            for k, (train_idx, val_idx) in enumerate(folds)
+        }
+        scores = {key: future.result() for key, future in futures.items()}
+
+    rows = []
+    for i, params in enumerate(combos):
+        accuracies, node_counts = zip(*(scores[i, k] for k in range(cv)))
+        rows.append({**params,
+                     'cv_accuracy': float(np.mean(accuracies)),
+                     'cv_accuracy_std': float(np.std(accuracies)),
+                     'node_count': float(np.mean(node_counts))})
+    results = pd.DataFrame(rows)
+    return results.sort_values(['cv_accuracy', 'node_count'],
+                               ascending=[False, True]).reset_index(drop=True)
+
+
+def best_params(results):
+    """Parameters of the top row of ``search`` results, as DecisionTreeClassifier kwargs."""
+    best = results.iloc[0]
+    params = {}
+    for key in PARAM_GRID:
+        value = best[key]
+        if key in ('max_depth', 'min_samples_leaf'):
+            value = None if pd.isna(value) else int(value)
+        else:
+            value = float(value)
+        params[key] = value
+    return params
+
+
+# -------------------------------------------
+# 🌲 Model Variants
+# -------------------------------------------
+def _fit_variant(params):
+    clf = DecisionTreeClassifier(random_state=RANDOM_STATE, **params)
+    return clf.fit(_worker_X, _worker_y)
+
+
+def _median_seconds(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def _dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def measure_variant(name, clf, test_X, test_y, out_dir, repeat=5):
+    """One row of the variants report; also writes the variant's pickle and bundle.
+
+    Both load times are measured from the files just written, so they are
+    comparable (open + parse for each format).
+    """
+    X = test_X.to_numpy(dtype=np.float64)
+    tree = CompiledTree.from_sklearn(clf)
+    labels, _ = tree.predict(X)
+
+    os.makedirs(os.path.join(out_dir, VARIANTS_DIR), exist_ok=True)
+    pickle_path = os.path.join(out_dir, VARIANTS_DIR, name + '.pickle')
+    with open(pickle_path, 'wb') as f:
+        pickle.dump(clf, f)
+    bundle_path = os.path.join(out_dir, VARIANTS_DIR, name)
+    save_bundle(clf, bundle_path, model_path=pickle_path)
+
+    rows = X[:1000]
+    single = _median_seconds(lambda: [tree.predict_one(row) for row in rows], repeat) / len(rows)
+    batch = _median_seconds(lambda: tree.predict(X), repeat)
+
+    return {
+        'variant': name,
+        'node_count': tree.node_count,
+        'max_depth': tree.max_depth,
+        'pickle_bytes': os.path.getsize(pickle_path),
+        'bundle_bytes': _dir_bytes(bundle_path),
+        'pickle_load_ms': _median_seconds(lambda: load_model(pickle_path), repeat) * 1e3,
+        'bundle_load_ms': _median_seconds(lambda: load_bundle(bundle_path), repeat) * 1e3,
+        'single_row_us': single * 1e6,
+        'batch_ms': batch * 1e3,
+        'batch_rows_per_sec': len(X) / batch,
+        'accuracy': accuracy_score(test_y, labels),
+        'f1_macro': f1_score(test_y, labels, average='macro'),
+    }
+
+
+def train_variants(train_X, train_y, test_X, test_y, out_dir='.', variants=VARIANTS, jobs=None):
+    """Fit every variant in parallel, then measure them one at a time.
+
+    Returns (report DataFrame, {variant: fitted classifier}).
+    """
+    X = train_X.to_numpy(dtype=np.float32)
+    y = train_y.to_numpy()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(X, y)) as pool:
+        futures = {name: pool.submit(_fit_variant, params) for name, params in variants.items()}
+        models = {name: future.result() for name, future in futures.items()}
+
+    # Fitted on arrays; restore the column names the apps' encoder reads
+    for clf in models.values():
+        clf.feature_names_in_ = np.asarray(train_X.columns, dtype=object)
+
+    rows = [measure_variant(name, clf, test_X, test_y, out_dir) for name, clf in models.items()]
+    return pd.DataFrame(rows), models
+
+
+def smallest_acceptable(report, min_accuracy):
+    """Name of the variant with the fewest nodes that reaches ``min_accuracy``."""
+    ok = report[report['accuracy'] >= min_accuracy]
+    if not len(ok):
+        return None
+    return ok.sort_values(['node_count', 'accuracy'], ascending=[True, False]).iloc[0]['variant']
+
+
+# -------------------------------------------
+# 💾 Artifacts
+# -------------------------------------------
+def save_confusion_matrix(clf, test_X, test_y, path):
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import pyplot as plt
+    from sklearn.metrics import ConfusionMatrixDisplay
+
+    y_pred = clf.predict(test_X)
+    cm = confusion_matrix(test_y, y_pred, labels=clf.classes_)
+    disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=clf.classes_)
+    fig, ax = plt.subplots(figsize=(5, 5))
+    plt.rcParams.update({'font.size': 12})
+    disp.plot(cmap='PuRd', ax=ax)
+    fig.savefig(path, bbox_inches='tight')
+    plt.close(fig)
+
+
+def save_feature_importance(clf, columns, path):
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import pyplot as plt
+
+    feature_imp = pd.DataFrame(list(zip(columns, clf.feature_importances_)),
+                               columns=['Feature', 'Importance'])
+    feature_imp = feature_imp.sort_values('Importance', ascending=False).reset_index(drop=True)
+
+    fig = plt.figure(figsize=(10, 5))
+    plt.barh(feature_imp['Feature'], feature_imp['Importance'], color=['purple', 'pink'])
+    plt.xlabel("Importance")
+    plt.ylabel("Input Feature")
+    plt.title('Which features are the most important for satisfaction prediction?')
+    plt.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def save_artifacts(clf, test_X, test_y, out_dir='.'):
+    """Pickle, model bundle, class_report.csv, confusion_mat.svg, feature_imp.svg."""
+    os.makedirs(out_dir, exist_ok=True)
+
+    report = classification_report(test_y, clf.predict(test_X), output_dict=True)
+    report_path = os.path.join(out_dir, REPORT_PATH)
+    pd.DataFrame(report).to_csv(report_path)
+
+    save_confusion_matrix(clf, test_X, test_y, os.path.join(out_dir, CONFUSION_PATH))
+    save_feature_importance(clf, test_X.columns, os.path.join(out_dir, IMPORTANCE_PATH))
+
+    model_path = os.path.join(out_dir, MODEL_PATH)
+    with open(model_path, 'wb') as f:
+        pickle.dump(clf, f)
+    save_bundle(clf, os.path.join(out_dir, BUNDLE_PATH), report_path=report_path, model_path=model_path)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the airline satisfaction decision tree.')
+    parser.add_argument('--data', default=CSV_PATH, help='airline survey CSV')
+    parser.add_argument('--out-dir', default='.', help='where to write the model and reports')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='worker processes for the search')
+    parser.add_argument('--cv', type=int, default=3, help='cross-validation folds per combination')
+    parser.add_argument('--no-search', action='store_true',
+                        help='skip the search and fit the notebook model (no depth limit)')
+    parser.add_argument('--variants', action='store_true',
+                        help='fit pruned/depth-capped variants and write a size/latency report')
+    parser.add_argument('--min-accuracy', type=float,
+                        help='accuracy a variant must keep (default: full tree minus --tolerance)')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--deploy', action='store_true',
+                        help='with --variants: save the smallest acceptable variant as the model')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    train_X, test_X, train_y, test_y = load_training_data(args.data)
+    print(f'Loaded {len(train_X):,} training / {len(test_X):,} test rows')
+
+    if args.variants:
+        report, models = train_variants(train_X, train_y, test_X, test_y, args.out_dir, jobs=args.jobs)
+        report.to_csv(os.path.join(args.out_dir, VARIANTS_PATH), index=False)
+        with pd.option_context('display.width', 200, 'display.max_columns', None):
+            print(report.round(4).to_string(index=False))
+
+        full_accuracy = report.loc[report['variant'] == 'full', 'accuracy'].iloc[0]
+        min_accuracy = args.min_accuracy if args.min_accuracy is not None else full_accuracy - args.tolerance
+        choice = smallest_acceptable(report, min_accuracy)
+        print(f'Smallest variant with accuracy >= {min_accuracy:.4f}: {choice}')
+        if args.deploy and choice is not None:
+            save_artifacts(models[choice], test_X, test_y, args.out_dir)
+            print(f'Deployed {choice} to {args.out_dir}')
+        return
+
+    params = {}
+    if not args.no_search:
+        results = search(train_X, train_y, cv=args.cv, jobs=args.jobs)
+        os.makedirs(args.out_dir, exist_ok=True)
+        results.to_csv(os.path.join(args.out_dir, SEARCH_PATH), index=False)
+        params = best_params(results)
+        print(f'Searched {len(results)} combinations x {args.cv} folds on {args.jobs} workers '
+              f'in {time.perf_counter() - start:.1f}s')
+        print(results.head(5).to_string(index=False))
+
+    clf = DecisionTreeClassifier(random_state=RANDOM_STATE, **params)
+    clf.fit(train_X, train_y)
+    report = save_artifacts(clf, test_X, test_y, args.out_dir)
+
+    print(f'Best params: {params or "notebook defaults"}; {clf.tree_.node_count} nodes, '
+          f'test accuracy {report["accuracy"]:.4f}, total {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
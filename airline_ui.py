@@ -0,0 +1,144 @@
+# ===========================================
+# 🧱 SHARED APP SECTIONS
+# ===========================================
+# Page sections rendered the same way by airline1_dt.py and airline_dt.py:
+# the prediction explanation, the what-if sweep, bulk file scoring and the
+# debug timing panel. Each app keeps its own header, sidebar, result card
+# and comparison expanders, and calls these for the rest.
+#
+# Only streamlit and the lightweight airline_* modules are imported here;
+# pandas and the scoring pool load on first use, as in the apps.
+
+import io
+import json
+import uuid
+
+import streamlit as st
+
+from airline_drift import format_report
+from airline_resources import get_drift_monitor, get_encoder, get_job_queue, get_prediction_cache, get_tree
+from airline_schema import CSV_PATH
+from airline_timing import PROCESS_STATS, TimingStats, format_table, record_rerun
+
+
+# -------------------------------------------
+# 🔍 Prediction Explanation and What-if
+# -------------------------------------------
+def show_explanation(explanation, predicted_satisfaction, timer):
+    """Decision path and per-field contributions from the same tree walk."""
+    with st.expander("🔍 Why this prediction?"):
+        st.write(f"Across all training passengers the model starts at **{explanation['base']:.1%}** "
+                 f"{predicted_satisfaction}; each answer on the decision path moves that up or down.")
+        st.dataframe([{'survey field': col, 'contribution': f"{value:+.1%}"}
+                      for col, value in explanation['contributions'].items()], hide_index=True)
+        st.write("**Decision path**")
+        st.dataframe([{'split': step['condition'], 'your value': step['value'],
+                       'contribution': f"{step['contribution']:+.1%}"}
+                      for step in explanation['steps']], hide_index=True)
+    timer.checkpoint('explanation')
+
+
+def show_whatif(encoder, survey, timer):
+    """Every single and pairwise rating change, scored in one batch."""
+    from airline_whatif import whatif_sweep
+
+    with timer.stage('whatif'):
+        whatif_df = whatif_sweep(encoder, get_tree(), survey)
+    n_flips = int(whatif_df['flips'].sum())
+    st.subheader("🔀 What-if: Rating Changes")
+    st.write(f"Scored **{len(whatif_df):,}** single and pairwise rating changes; "
+             f"**{n_flips:,}** of them flip the prediction. Top changes by effect:")
+    st.dataframe(whatif_df.head(25), hide_index=True)
+
+
+# -------------------------------------------
+# 📁 Bulk Scoring
+# -------------------------------------------
+def bulk_scoring(stats):
+    """File upload / airline.csv slice scoring on the shared background pool."""
+    with st.expander("📁 Score a Survey File"):
+        # Jobs run on a shared background pool; this rerun only submits them
+        session_id = st.session_state.setdefault('session_id', uuid.uuid4().hex)
+        uploaded_file = st.file_uploader("Upload a CSV with the same columns as airline.csv", type=['csv'])
+        slice_classes = st.multiselect("...or score the airline.csv passengers flying in these classes",
+                                       stats.levels('class'))
+        if uploaded_file is not None and st.button("Score File"):
+            data = uploaded_file.getvalue()
+            get_job_queue().submit(session_id, io.BytesIO(data), uploaded_file.name,
+                                   get_encoder(), get_tree(), size=len(data), monitor=get_drift_monitor())
+            st.session_state['scoring_jobs'] = True
+        if slice_classes and st.button("Score airline.csv Slice"):
+            get_job_queue().submit(session_id, CSV_PATH, f"airline.csv ({', '.join(slice_classes)})",
+                                   get_encoder(), get_tree(), row_filter={'class': slice_classes})
+            st.session_state['scoring_jobs'] = True
+
+        # The job pool (and pandas) is only loaded once this session has submitted a job
+        jobs = get_job_queue().jobs(session_id) if st.session_state.get('scoring_jobs') else []
+        if jobs:
+            # Poll for progress without rerunning the whole script, only while a job is active
+            active = any(job['status'] in ('queued', 'running') for job in jobs)
+            st.fragment(_show_jobs, run_every=1.0 if active else None)(session_id, active)
+
+
+def _show_jobs(session_id, polling):
+    jobs = get_job_queue().jobs(session_id)
+    if polling and not any(job['status'] in ('queued', 'running') for job in jobs):
+        # Last active job finished: rerun the page once so the fragment stops polling
+        st.rerun(scope='app')
+    for job in jobs:
+        st.write(f"**{job['name']}**: {job['status']}")
+        if job['status'] == 'failed':
+            st.error(job['error'])
+            continue
+        st.progress(job['progress'],
+                    text=f"{job['rows']:,} rows in {job['seconds']:.1f}s "
+                         f"({job['rows_per_sec']:,.0f} rows/s, last chunk {job['chunk_rows_per_sec']:,.0f} rows/s); "
+                         f"skipped {job['skipped']:,} incomplete rows")
+        if job['status'] == 'done':
+            # The result file is read only on the rerun after this click, not on every rerun
+            if st.button("Prepare Download", key=f"prepare_{job['id']}"):
+                with open(job['result_path'], 'rb') as f:
+                    st.download_button("Download Results", f.read(), file_name=f"scored_{job['id']}.csv",
+                                       mime='text/csv', key=f"download_{job['id']}", on_click='ignore')
+        elif job['status'] in ('queued', 'running'):
+            st.button("Cancel", key=f"cancel_{job['id']}", on_click=get_job_queue().cancel, args=(job['id'],))
+
+
+# -------------------------------------------
+# ⏱️ Debug Timing Panel
+# -------------------------------------------
+def debug_panel(timer, app, predicted, extra=None):
+    """Per-stage timings for this rerun, this session and the whole process.
+
+    Call last, once timer.enabled. extra() renders any app-specific debug
+    output inside the panel, above the JSON download button.
+    """
+    session_stats = st.session_state.setdefault('timing_stats', TimingStats())
+    timings = record_rerun(timer, session_stats, app=app)
+    with st.expander("⏱️ Rerun Timings (debug)", expanded=True):
+        st.markdown("**This rerun (ms)**")
+        st.markdown(format_table(timings))
+        session = session_stats.snapshot()
+        st.markdown(f"**This session** ({session['reruns']} reruns)")
+        st.markdown(format_table(session['stages']))
+        process = PROCESS_STATS.snapshot()
+        st.markdown(f"**All sessions in this process** ({process['reruns']} reruns)")
+        st.markdown(format_table(process['stages']))
+        cache = get_prediction_cache().stats() if predicted else None
+        if cache:
+            st.markdown(f"**Prediction cache:** {cache['size']:,}/{cache['maxsize']:,} entries, "
+                        f"{cache['hits']:,} hits, {cache['misses']:,} misses "
+                        f"({cache['hit_rate']:.1%} hit rate)")
+        monitor = get_drift_monitor()
+        drift = (monitor.report or monitor.check()) if monitor is not None and monitor.n else None
+        if drift:
+            st.markdown("**Input drift vs the training split**")
+            if drift['drifted'] or drift['predictions']['status'] == 'drift':
+                st.warning("Scored traffic has drifted from the training data.")
+            st.markdown(format_report(drift))
+        if extra is not None:
+            extra()
+        st.download_button("Download Timings (JSON)",
+                           json.dumps({'rerun': timings, 'session': session, 'process': process,
+                                       'prediction_cache': cache, 'drift': drift}, indent=2),
+                           file_name='airline_timings.json', mime='application/json')
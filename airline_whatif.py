@@ -0,0 +1,99 @@
+# ===========================================
+# 🔀 WHAT-IF RATING SWEEP
+# ===========================================
+# For one submitted survey, score every single-rating change and every pair
+# of rating changes (14 ratings x 1–5 stars: ~1,500 variants) as one matrix
+# in a single vectorized tree call, then rank the variants that flip the
+# prediction or move the probability of the other class the most.
+
+import numpy as np
+import pandas as pd
+
+from airline_schema import RATING_COLS
+
+# Star values offered by the apps' rating radios
+RATING_LEVELS = [1, 2, 3, 4, 5]
+
+
+def perturbation_matrix(encoder, survey, cols=RATING_COLS, levels=RATING_LEVELS, pairwise=True):
+    """Encoded variants of ``survey`` with one (or two) ratings changed.
+
+    Returns ``(X, col_a, val_a, col_b, val_b)``: one encoded row per variant,
+    the index into ``cols`` and new value of the first change, and of the
+    second change (``col_b == -1`` for single changes).
+    """
+    base = encoder.encode(survey)
+    positions = np.array([encoder.feature_names.index(col) for col in cols])
+    current = base[positions]
+    levels = np.asarray(levels, dtype=np.float64)
+    k, n_levels = len(cols), len(levels)
+
+    # Single changes: every column x every level except its current value
+    col_a = np.repeat(np.arange(k), n_levels)
+    val_a = np.tile(levels, k)
+    keep = val_a != current[col_a]
+    col_a, val_a = col_a[keep], val_a[keep]
+    col_b = np.full(len(col_a), -1)
+    val_b = np.zeros(len(col_a))
+
+    if pairwise:
+        # Pairs: every (i < j) x level_i x level_j, both different from current
+        i, j = np.triu_indices(k, 1)
+        pair_a = np.repeat(i, n_levels * n_levels)
+        pair_b = np.repeat(j, n_levels * n_levels)
+        pval_a = np.tile(np.repeat(levels, n_levels), len(i))
+        pval_b = np.tile(levels, len(i) * n_levels)
+        keep = (pval_a != current[pair_a]) & (pval_b != current[pair_b])
+        col_a = np.concatenate([col_a, pair_a[keep]])
+        val_a = np.concatenate([val_a, pval_a[keep]])
+        col_b = np.concatenate([col_b, pair_b[keep]])
+        val_b = np.concatenate([val_b, pval_b[keep]])
+
+    X = np.tile(base, (len(col_a), 1))
+    rows = np.arange(len(col_a))
+    X[rows, positions[col_a]] = val_a
+    pairs = col_b >= 0
+    X[rows[pairs], positions[col_b[pairs]]] = val_b[pairs]
+    return X, col_a, val_a, col_b, val_b
+
+
+def whatif_sweep(encoder, tree, survey, cols=RATING_COLS, levels=RATING_LEVELS, pairwise=True):
+    """Ranked DataFrame of rating changes and their effect on the prediction.
+
+    The target class is the one the survey is *not* predicted as (for a
+    dissatisfied passenger: satisfied). Rows that flip the prediction come
+    first, then the largest gains in the target probability, then the
+    smallest changes (fewest ratings, fewest stars moved).
+    """
+    base_label, base_proba = tree.predict_one(encoder.encode(survey))
+    classes = list(tree.classes)
+    base_idx = classes.index(base_label)
+    others = [i for i in np.argsort(base_proba)[::-1] if i != base_idx]
+    target_idx = int(others[0]) if others else base_idx
+    target = classes[target_idx]
+
+    X, col_a, val_a, col_b, val_b = perturbation_matrix(encoder, survey, cols, levels, pairwise)
+    labels, proba = tree.predict(X)
+
+    def describe(col, value):
+        return f"{cols[col]}: {survey[cols[col]]} → {int(value)}"
+
+    changes = [
+        describe(a, va) if b < 0 else f"{describe(a, va)}, {describe(b, vb)}"
+        for a, va, b, vb in zip(col_a, val_a, col_b, val_b)
+    ]
+    current = np.array([float(survey[col]) for col in cols])
+    moved = np.abs(val_a - current[col_a]) + np.where(col_b >= 0, np.abs(val_b - current[col_b]), 0)
+    target_proba = proba[:, target_idx]
+    result = pd.DataFrame({
+        'change': changes,
+        'ratings_changed': np.where(col_b >= 0, 2, 1),
+        'stars_moved': moved.astype(int),
+        'prediction': labels,
+        'flips': labels != base_label,
+        'confidence': proba.max(axis=1),
+        f'P({target})': target_proba,
+        'shift': target_proba - base_proba[target_idx],
+    })
+    return result.sort_values(['flips', 'shift', 'ratings_changed', 'stars_moved'],
+                              ascending=[False, False, True, True], kind='stable').reset_index(drop=True)